@@ -8,8 +8,14 @@ import time as _time
 discord_rpc: Any = None
 drpc: Any = None
 config: Any = None
-get_presence_template: Callable = None
 renpy: Any = None
+format_label_name: Callable = None
+get_discord_config: Callable = None
+get_game_name: Callable = None
+get_character_display_name: Callable = None
+get_presence_template: Callable = None
+discord_config: Any = None
+DiscordRPCPriority: Any = None
 
 """renpy
 init python:
@@ -19,6 +25,10 @@ class DiscordRPCAPI:
     """
     High-level API for Discord RPC integration in RenPy games
     Provides simple functions for common use cases
+
+    Every set_* method takes a `priority` ('critical', 'normal' or 'low',
+    see discord_rpc.update_presence()). The main menu is critical, dialogue
+    is low and everything else is normal by default.
     """
 
     @staticmethod
@@ -27,27 +37,50 @@ class DiscordRPCAPI:
         return bool(discord_rpc and discord_rpc.enabled)
     
     @staticmethod
-    def set_main_menu():
-        """Set Discord status to main menu"""
+    def set_main_menu(priority='critical'):
+        """
+        Set Discord status to main menu
+
+        Args:
+            priority (str): Update priority
+        """
         if not DiscordRPCAPI._is_enabled():
             return
 
-        presence = get_presence_template('main_menu_presence')
-        if presence:
-            discord_rpc.update_presence(force=True, **presence)
+        # First presence of the session: optionally wait (bounded) for Discord
+        discord_rpc.wait_for_startup()
+
+        discord_rpc.update_presence_template('main_menu_presence', priority=priority)
     
     @staticmethod
-    def set_in_game(chapter_name=None, character_name=None):
+    def set_in_game(chapter_name=None, character_name=None, priority='normal'):
         """
         Set Discord status for in-game state
         
         Args:
             chapter_name (str): Current chapter/scene name
             character_name (str): Current character being talked to
+            priority (str): Update priority
         """
         if not DiscordRPCAPI._is_enabled():
             return
-            
+
+        discord_rpc.update_presence(
+            priority=priority, **DiscordRPCAPI.build_in_game(chapter_name, character_name)
+        )
+
+    @staticmethod
+    def build_in_game(chapter_name=None, character_name=None):
+        """
+        Build the presence set_in_game() sends
+
+        Args:
+            chapter_name (str): Current chapter/scene name
+            character_name (str): Current character being talked to
+
+        Returns:
+            dict: Presence fields for discord_rpc.update_presence()
+        """
         state_text = "Играет"
         details_text = config.name or 'RenPy Game'
         
@@ -57,26 +90,43 @@ class DiscordRPCAPI:
         if character_name:
             details_text = f"Разговор с {character_name}"
         
-        discord_rpc.update_presence(
-            force=True,
-            state=state_text,
-            details=details_text,
-            large_image="game_icon",
-            large_text=config.name or 'RenPy Game'
-        )
+        return {
+            'state': state_text,
+            'details': details_text,
+            'large_image': "game_icon",
+            'large_text': config.name or 'RenPy Game'
+        }
     
     @staticmethod
-    def set_reading_dialogue(character_name=None, scene_name=None):
+    def set_reading_dialogue(character_name=None, scene_name=None, priority='low'):
         """
         Set Discord status for dialogue reading
         
         Args:
             character_name (str): Character currently speaking
             scene_name (str): Current scene name
+            priority (str): Update priority (speaker changes are cosmetic,
+                so they are dropped first under rate pressure)
         """
         if not DiscordRPCAPI._is_enabled():
             return
-            
+
+        discord_rpc.update_presence(
+            priority=priority, **DiscordRPCAPI.build_reading_dialogue(character_name, scene_name)
+        )
+
+    @staticmethod
+    def build_reading_dialogue(character_name=None, scene_name=None):
+        """
+        Build the presence set_reading_dialogue() sends
+
+        Args:
+            character_name (str): Character currently speaking
+            scene_name (str): Current scene name
+
+        Returns:
+            dict: Presence fields for discord_rpc.update_presence()
+        """
         if character_name and scene_name:
             state_text = f"Сцена: {scene_name}"
             details_text = f"Диалог с {character_name}"
@@ -90,70 +140,117 @@ class DiscordRPCAPI:
             state_text = "Читает диалог"
             details_text = config.name or 'RenPy Game'
         
-        discord_rpc.update_presence(
-            force=True,
-            state=state_text,
-            details=details_text,
-            large_image="game_icon",
-            large_text=config.name or 'RenPy Game'
-        )
+        return {
+            'state': state_text,
+            'details': details_text,
+            'large_image': "game_icon",
+            'large_text': config.name or 'RenPy Game'
+        }
     
     @staticmethod
-    def set_in_menu(menu_name="Меню"):
+    def set_in_menu(menu_name="Меню", priority='normal'):
         """
         Set Discord status for menu navigation
         
         Args:
             menu_name (str): Name of the current menu
+            priority (str): Update priority
         """
         if not DiscordRPCAPI._is_enabled():
             return
 
-        discord_rpc.update_presence(
-            force=True,
-            state=f"В меню: {menu_name}",
-            details=config.name or 'RenPy Game',
-            large_image="game_icon",
-            large_text=config.name or 'RenPy Game'
-        )
+        discord_rpc.update_presence(priority=priority, **DiscordRPCAPI.build_in_menu(menu_name))
+
+    @staticmethod
+    def build_in_menu(menu_name="Меню"):
+        """
+        Build the presence set_in_menu() sends
+
+        Args:
+            menu_name (str): Name of the current menu
+
+        Returns:
+            dict: Presence fields for discord_rpc.update_presence()
+        """
+        return {
+            'state': f"В меню: {menu_name}",
+            'details': config.name or 'RenPy Game',
+            'large_image': "game_icon",
+            'large_text': config.name or 'RenPy Game'
+        }
     
     @staticmethod
-    def set_paused():
-        """Set Discord status to paused"""
+    def set_paused(priority='normal'):
+        """
+        Set Discord status to paused
+
+        Args:
+            priority (str): Update priority
+        """
         if not DiscordRPCAPI._is_enabled():
             return
 
-        presence = get_presence_template('paused_presence')
-        if presence:
-            discord_rpc.update_presence(force=True, **presence)
+        discord_rpc.update_presence_template('paused_presence', priority=priority)
     
     @staticmethod
-    def set_loading():
-        """Set Discord status to loading"""
+    def set_loading(priority='normal'):
+        """
+        Set Discord status to loading
+
+        Args:
+            priority (str): Update priority
+        """
         if not DiscordRPCAPI._is_enabled():
             return
 
-        discord_rpc.update_presence(
-            force=True,
-            state="Загрузка...",
-            details=config.name or 'RenPy Game',
-            large_image="game_icon",
-            large_text=config.name or 'RenPy Game'
-        )
+        discord_rpc.update_presence(priority=priority, **DiscordRPCAPI.build_loading())
+
+    @staticmethod
+    def build_loading():
+        """
+        Build the presence set_loading() sends
+
+        Returns:
+            dict: Presence fields for discord_rpc.update_presence()
+        """
+        return {
+            'state': "Загрузка...",
+            'details': config.name or 'RenPy Game',
+            'large_image': "game_icon",
+            'large_text': config.name or 'RenPy Game'
+        }
     
     @staticmethod
-    def set_custom(state_text, details_text=None, **kwargs):
+    def set_custom(state_text, details_text=None, priority='normal', **kwargs):
         """
         Set custom Discord status
         
         Args:
             state_text (str): Custom state text
             details_text (str): Custom details text
+            priority (str): Update priority
             **kwargs: Additional Discord RPC parameters
         """
         if not DiscordRPCAPI._is_enabled():
             return
-            
+
+        discord_rpc.update_presence(
+            priority=priority, **DiscordRPCAPI.build_custom(state_text, details_text, **kwargs)
+        )
+
+    @staticmethod
+    def build_custom(state_text, details_text=None, **kwargs):
+        """
+        Build the presence set_custom() sends
+
+        Args:
+            state_text (str): Custom state text
+            details_text (str): Custom details text
+            **kwargs: Additional Discord RPC parameters
+
+        Returns:
+            dict: Presence fields for discord_rpc.update_presence()
+        """
         update_data = {
             'state': state_text,
             'details': details_text or (config.name or 'RenPy Game'),
@@ -166,10 +263,10 @@ class DiscordRPCAPI:
             if key not in ['large_image', 'large_text']:
                 update_data[key] = value
         
-        discord_rpc.update_presence(force=True, **update_data)
+        return update_data
     
     @staticmethod
-    def set_with_timestamp(state_text, details_text=None, start_time=None):
+    def set_with_timestamp(state_text, details_text=None, start_time=None, priority='normal'):
         """
         Set Discord status with timestamp
         
@@ -177,6 +274,7 @@ class DiscordRPCAPI:
             state_text (str): State text
             details_text (str): Details text
             start_time (int): Start timestamp (Unix time)
+            priority (str): Update priority
         """
         if not DiscordRPCAPI._is_enabled():
             return
@@ -184,7 +282,7 @@ class DiscordRPCAPI:
         import time
         
         discord_rpc.update_presence(
-            force=True,
+            priority=priority,
             state=state_text,
             details=details_text or (config.name or 'RenPy Game'),
             start=start_time or int(time.time()),
@@ -194,7 +292,7 @@ class DiscordRPCAPI:
     
     @staticmethod
     def clear():
-        """Clear Discord Rich Presence"""
+        """Clear Discord Rich Presence (always critical: never held or dropped)"""
         if DiscordRPCAPI._is_enabled():
             discord_rpc.clear_presence()
 
@@ -335,7 +433,7 @@ def update_discord_rpc_game_state(state_text, details_text=None):
             'state': state_text,
             'details': details_text or (config.name or 'RenPy Game')
         }
-        discord_rpc.update_presence(force=True, **update_data)
+        discord_rpc.update_presence(**update_data)
 
     return None
 
@@ -343,68 +441,420 @@ def update_discord_rpc_game_state(state_text, details_text=None):
 init python:
 """
 
+# Support for the `discord` creator-defined statement (libs/01-discord-rpc_ren.py)
+
+# Presence templates behind the argument-less subcommands
+DISCORD_STATEMENT_TEMPLATES = {
+    'paused': 'paused_presence',
+    'main_menu': 'main_menu_presence',
+}
+
+# Fields `discord template <name> key="value"` may override
+DISCORD_STATEMENT_TEMPLATE_FIELDS = ('state', 'details', 'large_image', 'large_text', 'small_image', 'small_text')
+
+# Discord rejects text shorter than the minimum; longer text is cut to the maximum
+DISCORD_TEXT_FIELD_LIMITS = {
+    'state': (2, 128),
+    'details': (2, 128),
+    'large_text': (2, 128),
+    'small_text': (2, 128),
+}
+DISCORD_MAX_BUTTONS = 2
+DISCORD_BUTTON_LABEL_MAX_LENGTH = 32
+
+# Update priority of each subcommand without a `priority` clause (others are 'normal')
+DISCORD_STATEMENT_PRIORITIES = {
+    'main_menu': 'critical',
+    'dialogue': 'low',
+}
+
+def is_discord_presence_template(name):
+    """
+    Check whether a discord_config section can be sent as a presence template
+
+    Only the presence sections (names ending in '_presence') qualify, so
+    `discord template connection` cannot send retry settings as activity fields.
+
+    Args:
+        name (str): Section name given to `discord template`
+
+    Returns:
+        bool: True if the section is a presence template
+    """
+    return name.endswith('_presence') and isinstance(getattr(discord_config, name, None), dict)
+
+def build_discord_statement_presence(subcommand, args):
+    """
+    Build the presence a `discord` statement sends
+
+    Args:
+        subcommand (str): Statement subcommand (e.g., 'custom', 'template')
+        args (dict): Literal arguments returned by parse_discord()
+
+    Returns:
+        dict: Presence fields, or None for an unknown subcommand or template
+    """
+    if subcommand == "custom":
+        return DiscordRPCAPI.build_custom(args["state"], args["details"])
+    elif subcommand == "dialogue":
+        return DiscordRPCAPI.build_reading_dialogue(args["character"], args["scene"])
+    elif subcommand == "in_game":
+        return DiscordRPCAPI.build_in_game(args["chapter"], args["character"])
+    elif subcommand == "menu":
+        return DiscordRPCAPI.build_in_menu(args["menu_name"])
+    elif subcommand == "loading":
+        return DiscordRPCAPI.build_loading()
+    elif subcommand in DISCORD_STATEMENT_TEMPLATES:
+        return get_presence_template(DISCORD_STATEMENT_TEMPLATES[subcommand])
+    elif subcommand == "template":
+        if not is_discord_presence_template(args["name"]):
+            return None
+        presence = get_presence_template(args["name"])
+        presence.update(args["overrides"])
+        return presence
+    elif subcommand == "batch":
+        # Later lines win field by field, like discord_rpc.batch()
+        presence = {}
+        for statement in args["statements"]:
+            presence.update(build_discord_statement_presence(statement["subcommand"], statement["args"]) or {})
+        return presence
+    return None
+
+def discord_statement_priority(subcommand, args, priority=None):
+    """
+    Return the update priority of a `discord` statement
+
+    Args:
+        subcommand (str): Statement subcommand
+        args (dict): Literal arguments returned by parse_discord()
+        priority (str): Name given in the statement's `priority` clause, if any
+
+    Returns:
+        int: DiscordRPCPriority value; a batch takes its highest line
+    """
+    if priority is not None:
+        return DiscordRPCPriority.resolve(priority)
+    if subcommand == "batch":
+        return max(
+            [discord_statement_priority(statement["subcommand"], statement["args"], statement.get("priority"))
+             for statement in args["statements"]] or [DiscordRPCPriority.NORMAL]
+        )
+    return DiscordRPCPriority.resolve(DISCORD_STATEMENT_PRIORITIES.get(subcommand, 'normal'))
+
+def validate_discord_presence(presence):
+    """
+    Check presence fields against Discord's limits
+
+    Args:
+        presence (dict): Presence fields
+
+    Returns:
+        list: Problem descriptions (empty if the presence is valid)
+    """
+    problems = []
+
+    for field, (min_length, max_length) in DISCORD_TEXT_FIELD_LIMITS.items():
+        value = presence.get(field)
+        if value is None:
+            continue
+        length = len(str(value))
+        if length < min_length:
+            problems.append(f"'{field}' is {length} characters long, Discord requires at least {min_length}")
+        elif length > max_length:
+            problems.append(f"'{field}' is {length} characters long and will be cut to {max_length}")
+
+    buttons = presence.get('buttons') or []
+    if len(buttons) > DISCORD_MAX_BUTTONS:
+        problems.append(f"{len(buttons)} buttons given, Discord shows at most {DISCORD_MAX_BUTTONS}")
+    for button in buttons:
+        label = str(button.get('label', ''))
+        if not label or len(label) > DISCORD_BUTTON_LABEL_MAX_LENGTH:
+            problems.append(f"button label '{label}' must be 1-{DISCORD_BUTTON_LABEL_MAX_LENGTH} characters")
+
+    return problems
+
+def lint_discord_statement(subcommand, args):
+    """
+    Check a parsed `discord` statement during Ren'Py lint
+
+    Args:
+        subcommand (str): Statement subcommand
+        args (dict): Literal arguments returned by parse_discord()
+
+    Returns:
+        list: Problem descriptions (empty if the statement is valid)
+    """
+    if subcommand == "batch":
+        if not args["statements"]:
+            return ["discord batch: block is empty"]
+        problems = []
+        for statement in args["statements"]:
+            problems.extend(lint_discord_statement(statement["subcommand"], statement["args"]))
+        return problems
+
+    if subcommand == "template":
+        name = args["name"]
+        if not name.endswith('_presence'):
+            return [f"discord template: '{name}' is not a presence template (names end in _presence)"]
+        if not is_discord_presence_template(name):
+            return [f"discord template: unknown presence template '{name}'"]
+        unknown = [key for key in args["overrides"] if key not in DISCORD_STATEMENT_TEMPLATE_FIELDS]
+        if unknown:
+            return [f"discord template: cannot override {', '.join(unknown)} "
+                    f"(allowed: {', '.join(DISCORD_STATEMENT_TEMPLATE_FIELDS)})"]
+
+    presence = build_discord_statement_presence(subcommand, args)
+    if not presence:
+        return [f"discord {subcommand}: statement builds an empty presence"]
+    return [f"discord {subcommand}: {problem}" for problem in validate_discord_presence(presence)]
+
+def execute_discord_statement(subcommand, args, key, priority=None):
+    """
+    Send the presence of a parsed `discord` statement
+
+    The payload is built and prepared the first time a statement runs and
+    cached under its key, so later runs are a lookup and a send.
+
+    Args:
+        subcommand (str): Statement subcommand
+        args (dict): Literal arguments returned by parse_discord()
+        key (tuple): Cache key returned by parse_discord()
+        priority (str): Name given in the statement's `priority` clause, if any
+    """
+    if not DiscordRPCAPI._is_enabled():
+        return
+
+    if subcommand == "main_menu" or (
+        subcommand == "batch" and any(statement["subcommand"] == "main_menu" for statement in args["statements"])
+    ):
+        # First presence of the session: optionally wait (bounded) for Discord
+        discord_rpc.wait_for_startup()
+
+    payload = discord_rpc.get_prepared_presence(
+        key, lambda: build_discord_statement_presence(subcommand, args)
+    )
+    discord_rpc.update_prepared_presence(
+        payload, priority=discord_statement_priority(subcommand, args, priority)
+    )
+
+"""renpy
+init python:
+"""
+
+import time
+
+
 class DiscordRPCAutoTracker:
-    """Automatic Discord RPC status tracking"""
+    """
+    Automatic Discord RPC status tracking
+    Ren'Py callbacks (config.label_callbacks, config.all_character_callbacks,
+    config.interact_callbacks) only record where the player is. The presence
+    is built and submitted from the interact callback, so all labels and
+    dialogue lines of one interaction cost at most one update. The update
+    takes the highest priority of the changes it carries: game start is
+    critical, label and menu changes are normal, speaker changes are low.
+
+    A presence set by the game itself (a `discord` statement, discord_set_*
+    or discord_rpc.update_presence()) takes over: tracked changes are not
+    submitted again until the next label starts.
+    """
+
+    # Engine labels that say nothing about where the player is
+    IGNORED_LABELS = frozenset([
+        'splashscreen', 'before_main_menu', 'main_menu', 'after_load', 'after_warp', 'quit',
+    ])
     
     def __init__(self):
         self.current_label = None
         self.current_character = None
         self.in_menu = False
         self.game_start_time = None
+        self.installed = False
+        self._dirty = False
+        self._priority = DiscordRPCPriority.LOW  # Of the changes not yet submitted
+        self._last_presence = None
+        self._manual = False  # The game set the presence since the last label change
+        self._submitting = False  # flush() is submitting the tracked presence
+
+    def install(self):
+        """
+        Register the Ren'Py callbacks
+
+        The discord_config.auto_tracking switches are checked when the
+        callbacks run, so games can change them with their own `define`.
+
+        Returns:
+            bool: True if tracking was installed by this call
+        """
+        if self.installed:
+            return False
+
+        config.label_callbacks.append(self._label_callback)
+        config.all_character_callbacks.append(self._character_callback)
+        config.interact_callbacks.append(self._interact_callback)
+        discord_rpc.add_presence_callback(self._presence_callback)
+
+        self.installed = True
+        return True
+
+    def is_tracking(self, kind):
+        """
+        Return True if discord_config.auto_tracking enables this kind of event
+
+        Args:
+            kind (str): 'track_labels', 'track_characters' or 'track_menus'
+        """
+        return bool(get_discord_config('auto_tracking.enabled', True) and
+                    get_discord_config('auto_tracking.' + kind, True))
+
+    def _label_callback(self, label_name, abnormal):
+        """config.label_callbacks entry"""
+        if label_name.startswith('_') or label_name in self.IGNORED_LABELS:
+            return
+        if self.is_tracking('track_labels'):
+            self.on_label_start(label_name)
+
+    def _character_callback(self, event, interact=True, **kwargs):
+        """config.all_character_callbacks entry"""
+        if event != 'begin' or not self.is_tracking('track_characters'):
+            return
+        # The say statement stores the speaker's variable name (None for narration)
+        who = getattr(renpy.store, '_last_say_who', None)
+        self.on_character_speak(self._character_name(who) if who else None)
+
+    def _presence_callback(self, kwargs):
+        """discord_rpc presence callback: a manual presence overrides tracking"""
+        if self._submitting:
+            return
+        self._manual = True
+        self._dirty = False
+        self._priority = DiscordRPCPriority.LOW
+        self._last_presence = None
+
+    def _interact_callback(self):
+        """config.interact_callbacks entry: submit at most once per interaction"""
+        if self.is_tracking('track_menus'):
+            in_menu = renpy.get_screen('choice') is not None
+            if in_menu != self.in_menu:
+                self.in_menu = in_menu
+                self._mark_dirty(DiscordRPCPriority.NORMAL)
+        self.flush()
+
+    def _character_name(self, who):
+        """Display name for a speaker variable name such as 'e'"""
+        names = get_discord_config('character_names', {}) or {}
+        if who in names:
+            return names[who]
+        character = getattr(renpy.store, who, None)
+        return get_character_display_name(character if character is not None else who)
     
     def on_label_start(self, label_name):
         """Called when a new label starts"""
+        if label_name == self.current_label:
+            return
+
         self.current_label = label_name
-        
-        # Auto-update based on label name patterns
-        if label_name.startswith("menu_"):
-            drpc.set_in_menu(label_name.replace("menu_", "").replace("_", " ").title())
-        elif label_name == "start":
-            import time
+        self.current_character = None
+        self._manual = False
+        if label_name == "start":
             self.game_start_time = int(time.time())
-            drpc.set_with_timestamp("Начало игры", start_time=self.game_start_time)
-        elif label_name.startswith("chapter_"):
-            chapter_name = label_name.replace("chapter_", "").replace("_", " ").title()
-            drpc.set_in_game(chapter_name)
+            self._mark_dirty(DiscordRPCPriority.CRITICAL)
         else:
-            drpc.set_in_game(label_name.replace("_", " ").title())
+            self._mark_dirty(DiscordRPCPriority.NORMAL)
     
     def on_character_speak(self, character_name):
-        """Called when a character speaks"""
-        self.current_character = character_name
-        drpc.set_reading_dialogue(character_name, self.current_label)
+        """Called when a character speaks (None for narration)"""
+        if character_name != self.current_character:
+            self.current_character = character_name
+            self._mark_dirty(DiscordRPCPriority.LOW)
     
     def on_menu_enter(self):
         """Called when entering a menu"""
-        self.in_menu = True
-        drpc.set_in_menu()
+        if not self.in_menu:
+            self.in_menu = True
+            self._mark_dirty(DiscordRPCPriority.NORMAL)
     
     def on_menu_exit(self):
         """Called when exiting a menu"""
-        self.in_menu = False
-        if self.current_label:
-            drpc.set_in_game(self.current_label.replace("_", " ").title())
+        if self.in_menu:
+            self.in_menu = False
+            self._mark_dirty(DiscordRPCPriority.NORMAL)
+
+    def _mark_dirty(self, priority):
+        """Record a change to submit, keeping the highest priority"""
+        self._dirty = True
+        self._priority = max(self._priority, priority)
+
+    def build_presence(self):
+        """
+        Build the presence for the tracked state
+
+        Returns:
+            dict: update_presence() arguments
+        """
+        game_name = get_game_name()
+        if self.current_label == "start":
+            scene = "Начало игры"
+        else:
+            scene = format_label_name(self.current_label) if self.current_label else None
+
+        if self.in_menu:
+            state, small_image = "Делает выбор", "choice"
+        elif self.current_character:
+            state, small_image = f"Диалог с {self.current_character}", "reading"
+        else:
+            state, small_image = scene or "Играет", "playing"
+
+        presence = {
+            'state': state,
+            'details': scene if scene and scene != state else game_name,
+            'large_image': 'game_icon',
+            'large_text': game_name,
+            'small_image': small_image,
+        }
+        if self.game_start_time and get_discord_config('timestamps.show_start_time', True):
+            presence['start'] = self.game_start_time
+        return presence
+
+    def flush(self):
+        """
+        Submit the tracked state as one presence update if it changed
+
+        Nothing is sent from the main menu or the game menu; the change is
+        kept until the player is back in the story. Nothing is sent either
+        while a presence set by the game is showing (until the next label).
+
+        Returns:
+            bool: True if an update was submitted
+        """
+        if not self._dirty:
+            return False
+        if self._manual:
+            self._dirty = False
+            self._priority = DiscordRPCPriority.LOW
+            return False
+        if getattr(renpy.store, 'main_menu', False) or getattr(renpy.store, '_menu', False):
+            return False
+        priority = self._priority
+        self._dirty = False
+        self._priority = DiscordRPCPriority.LOW
+
+        if not DiscordRPCAPI._is_enabled():
+            return False
+
+        presence = self.build_presence()
+        if presence == self._last_presence:
+            return False
+        self._last_presence = presence
+        self._submitting = True
+        try:
+            return discord_rpc.update_presence(priority=priority, **presence)
+        finally:
+            self._submitting = False
 
 
 # Create global auto-tracker instance
 discord_auto_tracker = DiscordRPCAutoTracker()
 
-# RenPy callback integration
-# Note: Automatic character tracking is disabled by default to avoid conflicts
-# To enable, uncomment the code below and test thoroughly with your game
-
-# init python:
-#     original_say = renpy.say
-#
-#     def wrapped_say(who, what, *args, **kwargs):
-#         """Wrapped say function to track character dialogue"""
-#         # Update Discord RPC if character is speaking
-#         if who and hasattr(who, 'name'):
-#             discord_auto_tracker.on_character_speak(who.name)
-#         elif who:
-#             discord_auto_tracker.on_character_speak(str(who))
-#
-#         return original_say(who, what, *args, **kwargs)
-#
-#     # Replace the say function
-#     renpy.say = wrapped_say
+# Track labels, dialogue and choice menus (see discord_config.auto_tracking)
+discord_auto_tracker.install()
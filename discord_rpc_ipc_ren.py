@@ -0,0 +1,559 @@
+# Discord RPC IPC Transport for RenPy
+# Native asyncio implementation of the Discord IPC protocol running on one
+# long-lived event loop thread for the whole process
+
+# IDE hints (not executed by Ren'Py)
+from typing import Any, Optional
+import asyncio
+import threading
+
+discord_ipc: Any = None
+DISCORD_IPC_AVAILABLE: bool = True
+
+"""renpy
+init -2 python:
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+# Discord IPC opcodes
+DISCORD_IPC_OP_HANDSHAKE = 0
+DISCORD_IPC_OP_FRAME = 1
+DISCORD_IPC_OP_CLOSE = 2
+DISCORD_IPC_OP_PING = 3
+DISCORD_IPC_OP_PONG = 4
+
+DISCORD_IPC_VERSION = 1
+DISCORD_IPC_PIPE_COUNT = 10
+DISCORD_IPC_HEADER = struct.Struct('<II')
+DISCORD_IPC_DEFAULT_TIMEOUT = 10.0
+
+# Codes of CLOSE frames (the client drops the socket)
+DISCORD_IPC_CLOSE_INVALID_CLIENT_ID = 4000
+DISCORD_IPC_CLOSE_INVALID_ORIGIN = 4001
+DISCORD_IPC_CLOSE_RATE_LIMITED = 4002
+DISCORD_IPC_CLOSE_TOKEN_REVOKED = 4003
+DISCORD_IPC_CLOSE_INVALID_VERSION = 4004
+DISCORD_IPC_CLOSE_AUTH_CODES = frozenset([
+    DISCORD_IPC_CLOSE_INVALID_CLIENT_ID, DISCORD_IPC_CLOSE_INVALID_ORIGIN,
+    DISCORD_IPC_CLOSE_TOKEN_REVOKED, DISCORD_IPC_CLOSE_INVALID_VERSION,
+])
+
+# Codes of ERROR events (the command failed, the socket stays open). Discord
+# rate limits by closing the socket (DISCORD_IPC_CLOSE_RATE_LIMITED); as an
+# ERROR code 4002 is INVALID_COMMAND, a permanent rejection
+DISCORD_IPC_ERROR_INVALID_PAYLOAD = 4000
+DISCORD_IPC_ERROR_INVALID_COMMAND = 4002
+DISCORD_IPC_ERROR_AUTH_CODES = frozenset([
+    4006,  # INVALID_PERMISSIONS
+    4007,  # INVALID_CLIENTID
+    4008,  # INVALID_ORIGIN
+    4009,  # INVALID_TOKEN
+])
+
+# Unix sockets live in the runtime dir; sandboxed clients use a subdirectory
+DISCORD_IPC_UNIX_SUBDIRS = ('', 'app/com.discordapp.Discord', 'snap.discord')
+
+DISCORD_IPC_AVAILABLE = sys.platform == 'win32' or hasattr(socket, 'AF_UNIX')
+
+
+class DiscordIPCError(Exception):
+    """Error reported by the Discord client or raised by the IPC transport"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class DiscordIPCTransportError(DiscordIPCError):
+    """The socket is gone, was never opened or stopped answering; reconnect"""
+
+
+class DiscordIPCPayloadError(DiscordIPCError):
+    """Discord rejected the command's payload; the connection is still good"""
+
+
+class DiscordIPCRateLimitError(DiscordIPCError):
+    """Discord closed the socket because commands were sent too often"""
+
+
+class DiscordIPCAuthError(DiscordIPCError):
+    """Discord rejected the client ID; reconnecting with it will not help"""
+
+
+def make_discord_ipc_error(message, code=None, closed=False):
+    """
+    Build the typed error for a Discord CLOSE frame or ERROR event
+
+    Args:
+        message (str): Message sent by Discord
+        code (int): Close or error code sent by Discord
+        closed (bool): True for a CLOSE frame, False for an ERROR event
+
+    Returns:
+        DiscordIPCError: Instance of the matching subclass
+    """
+    if closed:
+        if code in DISCORD_IPC_CLOSE_AUTH_CODES:
+            return DiscordIPCAuthError(message, code)
+        if code == DISCORD_IPC_CLOSE_RATE_LIMITED:
+            return DiscordIPCRateLimitError(message, code)
+        return DiscordIPCTransportError(message, code)
+
+    if code in DISCORD_IPC_ERROR_AUTH_CODES:
+        return DiscordIPCAuthError(message, code)
+    return DiscordIPCPayloadError(message, code)
+
+
+def get_discord_ipc_paths():
+    """
+    List candidate Discord IPC endpoints for the current platform
+
+    Returns:
+        list: Socket or named pipe paths, in the order they should be tried
+    """
+    if sys.platform == 'win32':
+        return [r'\\?\pipe\discord-ipc-{}'.format(i) for i in range(DISCORD_IPC_PIPE_COUNT)]
+
+    base = (os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or
+            os.environ.get('TMP') or os.environ.get('TEMP') or '/tmp')
+
+    paths = []
+    for subdir in DISCORD_IPC_UNIX_SUBDIRS:
+        for i in range(DISCORD_IPC_PIPE_COUNT):
+            paths.append(os.path.join(base, subdir, 'discord-ipc-{}'.format(i)))
+    return paths
+
+
+def build_discord_activity(payload):
+    """
+    Convert a prepared presence payload into a SET_ACTIVITY activity object
+
+    Args:
+        payload (dict): Flat presence fields (state, details, large_image, ...)
+
+    Returns:
+        dict: Activity object with empty values removed
+    """
+    activity = {
+        'state': payload.get('state'),
+        'details': payload.get('details'),
+        'timestamps': {
+            'start': payload.get('start'),
+            'end': payload.get('end'),
+        },
+        'assets': {
+            'large_image': payload.get('large_image'),
+            'large_text': payload.get('large_text'),
+            'small_image': payload.get('small_image'),
+            'small_text': payload.get('small_text'),
+        },
+        'party': {
+            'id': payload.get('party_id'),
+            'size': payload.get('party_size'),
+        },
+        'secrets': {
+            'join': payload.get('join'),
+            'spectate': payload.get('spectate'),
+            'match': payload.get('match'),
+        },
+        'buttons': payload.get('buttons') or None,
+        'instance': payload.get('instance', True),
+    }
+
+    def strip_empty(value):
+        if isinstance(value, dict):
+            cleaned = {k: strip_empty(v) for k, v in value.items()}
+            return {k: v for k, v in cleaned.items() if v is not None and v != {}}
+        return value
+
+    return strip_empty(activity)
+
+
+class DiscordIPCEngine:
+    """
+    Process-wide Discord IPC client
+    Runs a single asyncio event loop on a daemon thread. Other threads submit
+    coroutines with submit()/call(); only the loop thread touches the socket.
+    """
+
+    def __init__(self):
+        """Initialize the engine (the loop thread starts lazily)"""
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._pending = {}
+        self._nonces = itertools.count(1)
+        self._closing = False
+        self._handshaken = False
+
+        self.client_id = None
+        self.endpoint = None
+        self.connection_lost_callbacks = []
+
+    # -------------------------------------------------------------------------
+    # Loop thread management
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start the event loop thread if it is not running yet"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run_loop, name="DiscordIPCLoop", daemon=True)
+            self._thread.start()
+            started.wait()
+
+    def stop(self, timeout=2.0, close=True):
+        """
+        Close the connection and stop the loop thread
+
+        Args:
+            timeout (float): Max seconds to wait for the loop to finish
+            close (bool): Clear and close the connection first (skip when
+                the caller already did)
+        """
+        loop = self._loop
+        thread = self._thread
+        if not loop or not thread or not thread.is_alive():
+            return
+
+        if close:
+            try:
+                self.call(self.close(clear=True), timeout=timeout)
+            except Exception:
+                pass
+
+        def cancel_and_stop():
+            # Let pending requests unwind instead of being destroyed with the loop
+            tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+            if not tasks:
+                loop.stop()
+                return
+            for task in tasks:
+                task.cancel()
+            asyncio.gather(*tasks, return_exceptions=True).add_done_callback(lambda _: loop.stop())
+            loop.call_later(0.1, loop.stop)  # A task that ignores cancellation
+
+        loop.call_soon_threadsafe(cancel_and_stop)
+        if thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+            if thread.is_alive():
+                print("Warning: Discord IPC loop thread did not terminate cleanly")
+
+    def is_loop_thread(self):
+        """Return True when called from the event loop thread"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the IPC loop
+
+        Returns:
+            concurrent.futures.Future: Future with the coroutine result
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call(self, coro, timeout=DISCORD_IPC_DEFAULT_TIMEOUT):
+        """
+        Run a coroutine on the IPC loop and wait for its result
+
+        Args:
+            coro: Coroutine created from one of the engine methods
+            timeout (float): Max seconds to wait
+
+        Raises:
+            DiscordIPCError: On protocol errors or when the call times out
+        """
+        if self.is_loop_thread():
+            coro.close()
+            raise RuntimeError("DiscordIPCEngine.call() cannot block the IPC loop thread")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except (concurrent.futures.TimeoutError, asyncio.TimeoutError):
+            future.cancel()
+            raise DiscordIPCTransportError("Discord IPC call timed out")
+
+    def is_connected(self):
+        """Return True while a handshaken socket is open"""
+        return self._handshaken and self._writer is not None and not self._closing
+
+    # -------------------------------------------------------------------------
+    # Coroutines (run on the loop thread)
+    # -------------------------------------------------------------------------
+
+    async def connect(self, client_id, timeout=DISCORD_IPC_DEFAULT_TIMEOUT):
+        """
+        Open the IPC socket and perform the handshake
+
+        Args:
+            client_id (str): Discord application ID
+            timeout (float): Max seconds for socket discovery plus handshake
+        """
+        await self.close()
+        await asyncio.wait_for(self._open(client_id), timeout)
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    async def _open(self, client_id):
+        """Find a live endpoint and complete the handshake"""
+        last_error = None
+
+        for path in get_discord_ipc_paths():
+            if sys.platform != 'win32' and not os.path.exists(path):
+                continue
+            try:
+                reader, writer = await self._open_endpoint(path)
+            except (OSError, ValueError) as e:
+                last_error = e
+                continue
+
+            self._reader, self._writer = reader, writer
+            self._closing = False
+            try:
+                self._write_frame(DISCORD_IPC_OP_HANDSHAKE, {'v': DISCORD_IPC_VERSION, 'client_id': str(client_id)})
+                op, data = await self._read_frame()
+            except Exception:
+                self._drop_transport()
+                raise
+
+            if op == DISCORD_IPC_OP_CLOSE:
+                self._drop_transport()
+                raise make_discord_ipc_error(data.get('message', 'Handshake rejected'), data.get('code'), closed=True)
+            if data.get('evt') == 'ERROR':
+                self._drop_transport()
+                error = data.get('data') or {}
+                raise make_discord_ipc_error(error.get('message', 'Handshake failed'), error.get('code'))
+
+            self.client_id = str(client_id)
+            self.endpoint = path
+            self._handshaken = True
+            return
+
+        raise DiscordIPCTransportError("Could not find Discord installed and running" +
+                              (": {}".format(last_error) if last_error else ""))
+
+    async def _open_endpoint(self, path):
+        """Open a stream pair to a Unix socket or Windows named pipe"""
+        if sys.platform == 'win32':
+            loop = asyncio.get_running_loop()
+            reader = asyncio.StreamReader()
+            transport, protocol = await loop.create_pipe_connection(
+                lambda: asyncio.StreamReaderProtocol(reader), path
+            )
+            writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+            return reader, writer
+
+        return await asyncio.open_unix_connection(path)
+
+    async def set_activity(self, payload, pid=None):
+        """
+        Send SET_ACTIVITY for a prepared presence payload
+
+        Args:
+            payload (dict): Flat presence fields
+            pid (int): Process ID reported to Discord (defaults to this process)
+        """
+        args = {'pid': pid or os.getpid(), 'activity': build_discord_activity(payload)}
+        return await self.command('SET_ACTIVITY', args)
+
+    async def clear_activity(self, pid=None):
+        """Send SET_ACTIVITY without an activity, clearing the presence"""
+        return await self.command('SET_ACTIVITY', {'pid': pid or os.getpid()})
+
+    async def command(self, cmd, args):
+        """
+        Send an RPC command and wait for the matching response
+
+        Returns:
+            dict: Response frame
+        """
+        if not self.is_connected():
+            raise DiscordIPCTransportError("Not connected to Discord")
+
+        nonce = str(next(self._nonces))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = future
+
+        try:
+            self._write_frame(DISCORD_IPC_OP_FRAME, {'cmd': cmd, 'args': args, 'nonce': nonce})
+            await self._drain()
+            return await future
+        finally:
+            self._pending.pop(nonce, None)
+
+    async def ping(self):
+        """
+        Liveness probe: send PING and wait for the matching PONG
+
+        Leaves the activity untouched, unlike a SET_ACTIVITY round trip.
+
+        Returns:
+            float: Round trip in seconds
+        """
+        if not self.is_connected():
+            raise DiscordIPCTransportError("Not connected to Discord")
+
+        nonce = "ping-{}".format(next(self._nonces))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = future
+        started = time.perf_counter()
+
+        try:
+            self._write_frame(DISCORD_IPC_OP_PING, {'nonce': nonce})
+            await self._drain()
+            await future
+            return time.perf_counter() - started
+        finally:
+            self._pending.pop(nonce, None)
+
+    async def close(self, clear=False):
+        """
+        Send CLOSE and drop the socket (no-op when not connected)
+
+        Args:
+            clear (bool): Clear the activity first (best effort, short timeout)
+        """
+        if self._writer is None:
+            return
+
+        if clear and self.is_connected():
+            try:
+                await asyncio.wait_for(self.clear_activity(), 1.0)
+            except Exception:
+                pass  # Closing the socket clears the activity on Discord's side too
+
+        self._closing = True
+        try:
+            self._write_frame(DISCORD_IPC_OP_CLOSE, {})
+            await asyncio.wait_for(self._writer.drain(), 1.0)
+        except Exception:
+            pass  # Discord may already be gone; the socket is dropped below
+
+        task = self._read_task
+        self._read_task = None
+        self._drop_transport()
+        if task and task is not asyncio.current_task():
+            task.cancel()
+
+    # -------------------------------------------------------------------------
+    # Framing
+    # -------------------------------------------------------------------------
+
+    def _write_frame(self, op, data):
+        """Encode and buffer one frame"""
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        self._writer.write(DISCORD_IPC_HEADER.pack(op, len(body)) + body)
+
+    async def _drain(self):
+        """Flush buffered frames; a broken socket is a transport error"""
+        try:
+            await self._writer.drain()
+        except OSError as e:
+            raise DiscordIPCTransportError("Connection to Discord lost: {}".format(e))
+
+    async def _read_frame(self):
+        """Read one frame; returns (op, decoded JSON)"""
+        header = await self._reader.readexactly(DISCORD_IPC_HEADER.size)
+        op, length = DISCORD_IPC_HEADER.unpack(header)
+        body = await self._reader.readexactly(length) if length else b'{}'
+        return op, json.loads(body.decode('utf-8'))
+
+    async def _read_loop(self):
+        """Dispatch responses to waiting commands until the socket closes"""
+        error = None
+        try:
+            while True:
+                op, data = await self._read_frame()
+
+                if op == DISCORD_IPC_OP_PING:
+                    self._write_frame(DISCORD_IPC_OP_PONG, data)
+                    continue
+                if op == DISCORD_IPC_OP_PONG:
+                    future = self._pending.get(data.get('nonce'))
+                    if future is not None and not future.done():
+                        future.set_result(data)
+                    continue
+                if op == DISCORD_IPC_OP_CLOSE:
+                    error = make_discord_ipc_error(data.get('message', 'Discord closed the connection'),
+                                                   data.get('code'), closed=True)
+                    break
+
+                future = self._pending.get(data.get('nonce'))
+                if future is None or future.done():
+                    continue
+
+                if data.get('evt') == 'ERROR':
+                    payload = data.get('data') or {}
+                    future.set_exception(make_discord_ipc_error(payload.get('message', 'Discord error'), payload.get('code')))
+                else:
+                    future.set_result(data)
+        except asyncio.CancelledError:
+            return
+        except (asyncio.IncompleteReadError, OSError, ValueError) as e:
+            error = DiscordIPCTransportError("Connection to Discord lost: {}".format(e))
+
+        if self._closing:
+            return
+
+        self._read_task = None
+        # Waiting commands get the reason (e.g. a rate limit), not a generic close
+        self._fail_pending(error or DiscordIPCTransportError("Connection to Discord lost"))
+        self._drop_transport()
+
+        for callback in list(self.connection_lost_callbacks):
+            try:
+                callback(error)
+            except Exception as e:
+                print(f"Discord IPC connection-lost callback error: {e}")
+
+    def _drop_transport(self):
+        """Close the socket and forget the stream pair"""
+        writer = self._writer
+        self._reader = None
+        self._writer = None
+        self._handshaken = False
+        self._fail_pending(DiscordIPCTransportError("Connection to Discord closed"))
+
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def _fail_pending(self, error):
+        """Fail every command still waiting for a response"""
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+
+# Process-wide IPC engine shared by every DiscordRPC instance
+discord_ipc = DiscordIPCEngine()
@@ -5,16 +5,20 @@
 from typing import Optional, Any, Dict
 import threading
 import time
-from queue import Queue, Empty
 
 discord_rpc: Any = None
 reliable_discord_rpc: Any = None
 config: Any = None
 DiscordRPCStatus: Any = None
+DiscordIPCError: Any = None
+DiscordIPCTransportError: Any = None
+DiscordIPCPayloadError: Any = None
+DiscordIPCRateLimitError: Any = None
+DiscordIPCAuthError: Any = None
 get_discord_config: Any = None
-DISCORD_QUEUE_MAX_SIZE: int = 100
 DISCORD_THREAD_JOIN_TIMEOUT: float = 2.0
 DISCORD_MONITOR_INTERVAL: float = 5.0
+DISCORD_MONITOR_TASK: str = 'reliability.check'
 
 """renpy
 init python:
@@ -22,7 +26,9 @@ init python:
 
 import threading
 import time
-from queue import Queue, Empty
+
+# Scheduler key of the connection check
+DISCORD_MONITOR_TASK = 'reliability.check'
 
 
 class DiscordRPCReliabilityManager:
@@ -39,14 +45,11 @@ class DiscordRPCReliabilityManager:
             discord_rpc_instance: The main DiscordRPC instance
         """
         self.discord_rpc = discord_rpc_instance
-        self.monitor_thread = None
         self.monitoring = False
-        self.update_queue = Queue(maxsize=DISCORD_QUEUE_MAX_SIZE)
         self.last_successful_update = None
         self.connection_timeout = 30.0
         self.update_timeout = 10.0
         self.health_check_interval = 60.0
-        self.max_queue_size = DISCORD_QUEUE_MAX_SIZE
         self._lock = threading.RLock()
         self._shutdown_flag = False
 
@@ -55,50 +58,90 @@ class DiscordRPCReliabilityManager:
                 self.connection_timeout = get_discord_config('connection.connection_timeout', 30.0)
                 self.update_timeout = get_discord_config('connection.update_timeout', 10.0)
                 self.health_check_interval = get_discord_config('connection.health_check_interval', 60.0)
-                self.max_queue_size = get_discord_config('queue.max_reliability_queue', DISCORD_QUEUE_MAX_SIZE)
-                self.update_queue = Queue(maxsize=self.max_queue_size)
         except Exception as e:
             print(f"Warning: Failed to load Discord RPC reliability config: {e}")
         
     def start_monitoring(self):
         """Start connection monitoring"""
         with self._lock:
-            if self.monitoring:
-                return
-                
+            # Count the fresh connection as the last sign of life
+            self.last_successful_update = time.time()
             self.monitoring = True
             self._shutdown_flag = False
-            self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-            self.monitor_thread.start()
+        self._schedule_check()
         
-    def stop_monitoring(self):
-        """Stop connection monitoring"""
+    def stop_monitoring(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """
+        Stop connection monitoring
+
+        Args:
+            timeout (float): Max seconds to wait for a check in progress
+                (0 returns at once)
+        """
         with self._lock:
             self.monitoring = False
             self._shutdown_flag = True
-            thread = self.monitor_thread
-            
-        if thread and thread.is_alive():
-            thread.join(timeout=DISCORD_THREAD_JOIN_TIMEOUT * 2.5)
-            if thread.is_alive():
-                print("Warning: Monitor thread did not terminate cleanly")
-            
-    def _monitor_loop(self):
-        """Main monitoring loop"""
-        while not self._shutdown_flag:
-            with self._lock:
-                should_monitor = self.monitoring
-                
-            if not should_monitor:
-                break
-                
-            try:
-                self._check_connection_health()
-                self._process_update_queue()
-                time.sleep(DISCORD_MONITOR_INTERVAL)
-            except Exception as e:
-                print(f"Discord RPC monitor error: {e}")
-                time.sleep(DISCORD_MONITOR_INTERVAL * 2)  # Wait longer on error
+
+        scheduler = self.discord_rpc.scheduler
+        scheduler.cancel(DISCORD_MONITOR_TASK)
+        if timeout and not scheduler.wait(DISCORD_MONITOR_TASK, timeout=timeout):
+            print("Warning: Connection check did not terminate cleanly")
+
+    def wake(self):
+        """Re-evaluate the monitor now (status change)"""
+        self._schedule_check()
+
+    def _next_deadline(self):
+        """
+        Return the time.time() of the next timed check, or None if nothing is due
+
+        Deadlines: connection timeout while connecting, and the health check
+        after health_check_interval without a sign of life.
+        """
+        deadlines = []
+        rpc = self.discord_rpc
+        if not rpc.enabled:
+            return None
+
+        if rpc.status == DiscordRPCStatus.CONNECTING and rpc.connection_start_time:
+            deadlines.append(rpc.connection_start_time + self.connection_timeout)
+        if rpc.connected and self.last_successful_update:
+            deadlines.append(self.last_successful_update + self.health_check_interval)
+
+        return min(deadlines) if deadlines else None
+
+    def _schedule_check(self, delay=None):
+        """
+        Schedule the next connection check on the shared scheduler
+
+        The check runs at the next deadline (or after delay), so an idle
+        connection costs no wakeups; with no deadline nothing is scheduled.
+        """
+        scheduler = self.discord_rpc.scheduler
+        with self._lock:
+            if not self.monitoring or self._shutdown_flag:
+                scheduler.cancel(DISCORD_MONITOR_TASK)
+                return
+            if delay is None:
+                deadline = self._next_deadline()
+                if deadline is None:
+                    scheduler.cancel(DISCORD_MONITOR_TASK)
+                    return
+                delay = deadline - time.time()
+
+        # The health probe waits on Discord, so it runs on a worker thread
+        scheduler.schedule(DISCORD_MONITOR_TASK, delay, self._run_check, blocking=True)
+
+    def _run_check(self):
+        """Scheduled connection check, reschedules itself"""
+        try:
+            self._check_connection_health()
+        except Exception as e:
+            print(f"Discord RPC monitor error: {e}")
+            # Back off; stop_monitoring() cancels it
+            self._schedule_check(DISCORD_MONITOR_INTERVAL)
+            return
+        self._schedule_check()
                 
     def _check_connection_health(self):
         """Check if connection is healthy"""
@@ -116,41 +159,39 @@ class DiscordRPCReliabilityManager:
             self.discord_rpc._set_status(DiscordRPCStatus.TIMEOUT)
             self._attempt_recovery()
             
-        # Check for stale updates
+        # Probe the connection once it has been quiet for a while
         if (self.last_successful_update and 
             current_time - self.last_successful_update > self.health_check_interval and
             self.discord_rpc.connected):
             
-            # Send a health check update
-            self._health_check_update()
+            self._health_check_probe()
             
-    def _health_check_update(self):
-        """Send a health check update to verify connection"""
+    def _health_check_probe(self):
+        """
+        Verify the connection with a PING/PONG round trip
+
+        The probe is a protocol-level heartbeat, so the activity friends see
+        is never touched. Its round trip is recorded in the metrics.
+        """
         try:
             with self.discord_rpc._lock:
-                rpc = self.discord_rpc.rpc
+                ipc = self.discord_rpc.ipc
                 is_connected = self.discord_rpc.connected
-                last_update = self.discord_rpc.last_update.copy() if self.discord_rpc.last_update else None
             
-            if rpc and is_connected:
-                # Try a minimal update
-                self.discord_rpc._bind_rpc_loop(rpc)
-                rpc.update(
-                    state="Проверка соединения",
-                    details=config.name or 'RenPy Game'
-                )
-                
-                with self._lock:
-                    self.last_successful_update = time.time()
-                
-                # Restore previous state if available
-                if last_update:
-                    def restore_state():
-                        if not self._shutdown_flag:
-                            self.discord_rpc._update_presence_internal(last_update, force=True)
-                    threading.Timer(2.0, restore_state).start()
+            if not is_connected:
+                return
+            if not ipc.is_connected():
+                raise DiscordIPCTransportError("Discord IPC socket is closed")
+
+            round_trip = ipc.call(ipc.ping(), timeout=self.update_timeout)
+            self.discord_rpc.metrics.increment('health_checks')
+            self.discord_rpc.metrics.observe('health_check', round_trip)
+            
+            with self._lock:
+                self.last_successful_update = time.time()
                     
         except Exception as e:
+            self.discord_rpc.metrics.increment('health_check_failures')
             print(f"Discord RPC health check failed: {e}")
             
             with self.discord_rpc._lock:
@@ -160,44 +201,14 @@ class DiscordRPCReliabilityManager:
             self._attempt_recovery()
 
             
-    def _process_update_queue(self):
-        """Process queued updates"""
-        while not self.update_queue.empty():
-            try:
-                update_data = self.update_queue.get_nowait()
-                
-                with self.discord_rpc._lock:
-                    is_connected = self.discord_rpc.connected
-                
-                if is_connected:
-                    success = self.discord_rpc._update_presence_internal(update_data)
-                    if success:
-                        with self._lock:
-                            self.last_successful_update = time.time()
-                else:
-                    # Re-queue if not connected
-                    if self.update_queue.qsize() < self.max_queue_size:
-                        try:
-                            self.update_queue.put_nowait(update_data)
-                        except Exception:
-                            pass  # Queue full, drop update
-                    break
-            except Empty:
-                break
-            except Exception as e:
-                print(f"Error processing update queue: {e}")
-                
     def queue_update(self, update_data):
-        """Queue an update for reliable delivery"""
-        try:
-            while self.update_queue.full():
-                try:
-                    self.update_queue.get_nowait()
-                except Exception:
-                    break
-            self.update_queue.put_nowait(update_data.copy())
-        except Exception as e:
-            print(f"Discord RPC update queue full, dropping update: {e}")
+        """
+        Queue an update for delivery once connected
+
+        Goes through the main outbox, so it follows the same latest-wins
+        policy and is restored by the next successful connection.
+        """
+        return self.discord_rpc.queue_presence(update_data)
             
     def _attempt_recovery(self):
         """Attempt to recover from connection issues"""
@@ -206,44 +217,62 @@ class DiscordRPCReliabilityManager:
                 return
                 
         print("Attempting Discord RPC recovery...")
+        self.discord_rpc.metrics.increment('recoveries')
         
         # Reset connection state
         with self.discord_rpc._lock:
             self.discord_rpc.connected = False
         
         # Close existing connection
-        self.discord_rpc._safe_close_rpc()
+        self.discord_rpc._close_ipc()
             
-        # Reset retry count if it's been a while
-        current_time = time.time()
-        with self.discord_rpc._lock:
-            if (self.discord_rpc.connection_start_time and 
-                current_time - self.discord_rpc.connection_start_time > 300):  # 5 minutes
-                self.discord_rpc.retry_count = 0
-            
-            retry_count = self.discord_rpc.retry_count
-            max_retries = self.discord_rpc.max_retries
-            
-        # Attempt reconnection
-        if retry_count < max_retries and not self._shutdown_flag:
-            def reconnect():
-                if not self._shutdown_flag and self.discord_rpc.enabled:
-                    self.discord_rpc.connect()
-            threading.Timer(self.discord_rpc.retry_delay, reconnect).start()
-        else:
-            print("Discord RPC max retries exceeded, giving up")
-            self.discord_rpc._set_status(DiscordRPCStatus.ERROR)
+        # The reconnect policy decides the delay and never gives up unless
+        # background retries are disabled
+        if not self._shutdown_flag:
+            self.discord_rpc._schedule_retry()
 
 
 class DiscordRPCErrorHandler:
-    """Handles specific Discord RPC errors and provides appropriate responses"""
+    """
+    Handles specific Discord RPC errors and provides appropriate responses
+    Typed IPC errors are recognised by class (see make_discord_ipc_error());
+    messages are only matched for errors raised outside the IPC transport.
+    """
+
+    # Error class -> kind, most specific first
+    ERROR_KINDS = (
+        (DiscordIPCAuthError, 'auth'),
+        (DiscordIPCRateLimitError, 'rate_limited'),
+        (DiscordIPCPayloadError, 'payload'),
+        (DiscordIPCTransportError, 'transport'),
+    )
+
+    @staticmethod
+    def classify(error):
+        """
+        Return the kind of a Discord RPC error
+
+        Returns:
+            str: 'auth', 'rate_limited', 'payload', 'transport' or None for
+                an error that is not a typed IPC error
+        """
+        for error_class, kind in DiscordRPCErrorHandler.ERROR_KINDS:
+            if isinstance(error, error_class):
+                return kind
+        return None
     
     @staticmethod
     def handle_connection_error(error):
         """Handle connection-related errors"""
+        kind = DiscordRPCErrorHandler.classify(error)
+        if kind == 'auth':
+            return "Неверный Client ID. Проверьте настройки Discord RPC."
+        elif kind == 'rate_limited':
+            return "Discord ограничил частоту подключений. Подождите немного."
+
         error_str = str(error).lower()
         
-        if "discord not found" in error_str or "no discord client" in error_str:
+        if "could not find discord" in error_str or "discord not found" in error_str or "no discord client" in error_str:
             return "Discord не запущен. Запустите Discord и попробуйте снова."
         elif "invalid client id" in error_str:
             return "Неверный Client ID. Проверьте настройки Discord RPC."
@@ -257,6 +286,16 @@ class DiscordRPCErrorHandler:
     @staticmethod
     def handle_update_error(error):
         """Handle update-related errors"""
+        kind = DiscordRPCErrorHandler.classify(error)
+        if kind == 'payload':
+            return "Неверные данные для обновления статуса."
+        elif kind == 'rate_limited':
+            return "Слишком частые обновления. Подождите немного."
+        elif kind == 'transport':
+            return "Соединение с Discord потеряно."
+        elif kind == 'auth':
+            return "Неверный Client ID. Проверьте настройки Discord RPC."
+
         error_str = str(error).lower()
         
         if "invalid payload" in error_str:
@@ -286,6 +325,9 @@ class ReliableDiscordRPC:
             self.reliability_manager.start_monitoring()
         elif new_status in [DiscordRPCStatus.DISABLED, DiscordRPCStatus.ERROR]:
             self.reliability_manager.stop_monitoring()
+        else:
+            # Deadlines depend on the status (e.g. connection timeout)
+            self.reliability_manager.wake()
             
     def safe_update(self, **kwargs):
         """Safely update Discord RPC with error handling"""
@@ -301,8 +343,7 @@ class ReliableDiscordRPC:
                 return self.discord_rpc.update_presence(**kwargs)
 
             # Queue for later delivery
-            self.reliability_manager.queue_update(kwargs)
-            return True
+            return self.reliability_manager.queue_update(kwargs)
         except Exception as e:
             error_msg = self.error_handler.handle_update_error(e)
             print(f"Discord RPC safe update failed: {error_msg}")
@@ -319,8 +360,13 @@ class ReliableDiscordRPC:
             return False
             
     def cleanup(self):
-        """Cleanup reliability features"""
-        self.reliability_manager.stop_monitoring()
+        """
+        Cleanup reliability features
+
+        Does not wait for a check in progress: discord_rpc.shutdown() joins
+        the scheduler workers under its own deadline.
+        """
+        self.reliability_manager.stop_monitoring(timeout=0)
 
 
 # Create reliable wrapper for global discord_rpc instance
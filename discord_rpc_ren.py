@@ -3,21 +3,31 @@
 
 # IDE hints (not executed by Ren'Py)
 from typing import Optional, Dict, Any, List, Callable
-import asyncio
 import threading
 import time
-from queue import Queue
 
 # Ren'Py store hints
 discord_rpc: Any = None
 persistent: Any = None
 config: Any = None
+renpy: Any = None
 discord_config: Any = None
 get_discord_config: Callable = None
 get_presence_template: Callable = None
+get_game_name: Callable = None
+format_label_name: Callable = None
+discord_config_snapshot: Any = None
 resolve_image_asset: Callable = None
 init_reliable_discord_rpc: Callable = None
-PYPRESENCE_AVAILABLE: bool = True
+discord_ipc: Any = None
+set_discord_presence_state: Callable = None
+get_discord_presence_state: Callable = None
+DiscordIPCError: Any = None
+DiscordIPCTransportError: Any = None
+DiscordIPCPayloadError: Any = None
+DiscordIPCRateLimitError: Any = None
+DiscordIPCAuthError: Any = None
+DISCORD_IPC_AVAILABLE: bool = True
 
 """renpy
 init -1 python:
@@ -26,22 +36,21 @@ init -1 python:
 import threading
 import time
 import traceback
-import asyncio
-from queue import Queue
+import json
+import random
+import heapq
+import collections
+import itertools
 
-try:
-    from pypresence import Presence
-    PYPRESENCE_AVAILABLE = True
-except ImportError:
-    PYPRESENCE_AVAILABLE = False
-    print("Warning: pypresence not available. Discord RPC will be disabled.")
+if not DISCORD_IPC_AVAILABLE:
+    print("Warning: Discord IPC is not supported on this platform. Discord RPC will be disabled.")
 
 # Discord RPC Constants
 DISCORD_DEFAULT_CLIENT_ID = "1234567890123456789"
-DISCORD_QUEUE_MAX_SIZE = 100
 DISCORD_THREAD_JOIN_TIMEOUT = 2.0
 DISCORD_MONITOR_INTERVAL = 5.0
-DISCORD_RETRY_RESET_TIME = 300  # 5 minutes in seconds
+DISCORD_SCHEDULER_MAX_WORKERS = 2  # Threads for blocking scheduled tasks (connect, health probe)
+DISCORD_SHUTDOWN_TIMEOUT = 1.5  # Overall budget for shutdown() on game exit
 
 
 class DiscordRPCStatus:
@@ -69,6 +78,991 @@ class DiscordRPCStatus:
         return colors.get(status, "#ffffff")
 
 
+class DiscordRPCPriority:
+    """
+    Enum-like class for presence update priority (higher wins)
+      - CRITICAL: transitions the player must see (main menu, game start);
+        may use the reserved rate limit tokens and preempts held updates
+      - NORMAL: gameplay updates; coalesced while rate limited
+      - LOW: cosmetic updates (speaker changes); shed first under rate
+        pressure and while reconnecting
+    """
+    LOW = 0
+    NORMAL = 1
+    CRITICAL = 2
+
+    NAMES = {'low': LOW, 'normal': NORMAL, 'critical': CRITICAL}
+
+    @staticmethod
+    def resolve(priority=None, force=False):
+        """
+        Turn a priority argument into a priority value
+
+        Args:
+            priority: DiscordRPCPriority value, its name ('low', 'normal',
+                'critical') or None
+            force (bool): Shorthand for CRITICAL when priority is None
+
+        Returns:
+            int: DiscordRPCPriority value
+        """
+        if priority is None:
+            return DiscordRPCPriority.CRITICAL if force else DiscordRPCPriority.NORMAL
+        if isinstance(priority, str):
+            if priority in DiscordRPCPriority.NAMES:
+                return DiscordRPCPriority.NAMES[priority]
+        elif priority in DiscordRPCPriority.NAMES.values():
+            return priority
+        print(f"Warning: Unknown Discord RPC priority {priority!r}, using 'normal'")
+        return DiscordRPCPriority.NORMAL
+
+
+class DiscordRPCMetrics:
+    """
+    Runtime metrics registry for the RPC subsystem
+    Counters and fixed-bucket latency histograms, cheap enough to update on
+    every call and to snapshot from a screen
+    """
+
+    COUNTERS = (
+        'updates_requested',       # update_presence() calls while enabled
+        'updates_sent',            # Updates acknowledged by Discord
+        'updates_deduplicated',    # Skipped, Discord already shows the payload
+        'updates_throttled',       # Held back by the rate limiter
+        'updates_coalesced',       # Superseded by a newer update before sending
+        'updates_shed',            # Low-priority updates dropped under rate pressure or while reconnecting
+        'updates_queued',          # Queued while not connected
+        'updates_deferred',        # Held back while the game was skipping
+        'updates_batched',         # Merged into a discord_rpc.batch() block
+        'updates_failed',          # IPC writes that raised
+        'updates_rejected',        # Payloads Discord refused; dropped, the connection is kept
+        'updates_rate_limited',    # Refused by Discord's rate limit; held for the next token
+        'connects',                # Successful handshakes
+        'reconnects',              # Successful handshakes after the first one
+        'connect_failures',        # Failed connection attempts
+        'health_checks',           # Successful PING/PONG liveness probes
+        'health_check_failures',   # Failed reliability health checks
+        'recoveries',              # Recovery attempts by the reliability manager
+    )
+
+    HISTOGRAMS = ('ipc_round_trip', 'connect_time', 'health_check')
+
+    # Upper bucket bounds in milliseconds, the last bucket is open-ended
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zero every counter and histogram"""
+        with self._lock:
+            self._started = time.time()
+            self._counters = dict.fromkeys(self.COUNTERS, 0)
+            self._histograms = {name: self._empty_histogram() for name in self.HISTOGRAMS}
+
+    def _empty_histogram(self):
+        return {
+            'count': 0,
+            'sum': 0.0,
+            'min': None,
+            'max': None,
+            'buckets': [0] * (len(self.BUCKETS_MS) + 1),
+        }
+
+    def increment(self, name, amount=1):
+        """
+        Add to a counter
+
+        Args:
+            name (str): Counter name from COUNTERS
+            amount (int): Value to add
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def get(self, name):
+        """Return the current value of a counter"""
+        return self._counters.get(name, 0)
+
+    def observe(self, name, seconds):
+        """
+        Record a latency sample
+
+        Args:
+            name (str): Histogram name from HISTOGRAMS
+            seconds (float): Measured duration
+        """
+        value = seconds * 1000.0
+        index = len(self.BUCKETS_MS)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if value <= bound:
+                index = i
+                break
+
+        with self._lock:
+            histogram = self._histograms.setdefault(name, self._empty_histogram())
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['buckets'][index] += 1
+            if histogram['min'] is None or value < histogram['min']:
+                histogram['min'] = value
+            if histogram['max'] is None or value > histogram['max']:
+                histogram['max'] = value
+
+    def _percentile(self, histogram, fraction):
+        """Estimate a percentile as the upper bound of the bucket holding it"""
+        if not histogram['count']:
+            return None
+        rank = fraction * histogram['count']
+        seen = 0
+        for i, count in enumerate(histogram['buckets']):
+            seen += count
+            if seen >= rank:
+                bound = self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else histogram['max']
+                return min(bound, histogram['max'])
+        return histogram['max']
+
+    def snapshot(self):
+        """
+        Return a copy of all metrics
+
+        Returns:
+            dict: Dictionary with keys:
+                - uptime (float): Seconds since the metrics were reset
+                - counters (dict): Counter name -> value
+                - histograms (dict): Histogram name -> dict with count, avg_ms,
+                  min_ms, max_ms, p50_ms, p99_ms and buckets ({"<=N ms": count})
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                name: dict(histogram, buckets=list(histogram['buckets']))
+                for name, histogram in self._histograms.items()
+            }
+            started = self._started
+
+        labels = ["<={}ms".format(bound) for bound in self.BUCKETS_MS]
+        labels.append(">{}ms".format(self.BUCKETS_MS[-1]))
+
+        summary = {}
+        for name, histogram in histograms.items():
+            count = histogram['count']
+            summary[name] = {
+                'count': count,
+                'avg_ms': histogram['sum'] / count if count else None,
+                'min_ms': histogram['min'],
+                'max_ms': histogram['max'],
+                'p50_ms': self._percentile(histogram, 0.50),
+                'p99_ms': self._percentile(histogram, 0.99),
+                'buckets': dict(zip(labels, histogram['buckets'])),
+            }
+
+        return {
+            'uptime': time.time() - started,
+            'counters': counters,
+            'histograms': summary,
+        }
+
+
+class DiscordRPCReconnectPolicy:
+    """
+    Reconnect delay policy
+    Exponential backoff with jitter for the first attempts, then indefinite
+    low-frequency background attempts (e.g. Discord was started late)
+    """
+
+    def __init__(self):
+        self.base_delay = 5.0
+        self.multiplier = 2.0
+        self.max_delay = 60.0
+        self.jitter = 0.2
+        self.max_retries = 3
+        self.background_enabled = True
+        self.background_interval = 120.0
+        self.attempt = 0
+
+    def configure(self, base_delay=None, multiplier=None, max_delay=None, jitter=None,
+                  max_retries=None, background_enabled=None, background_interval=None):
+        """Update settings, keeping current values for arguments left as None"""
+        if base_delay is not None:
+            self.base_delay = max(0.0, float(base_delay))
+        if multiplier is not None:
+            self.multiplier = max(1.0, float(multiplier))
+        if max_delay is not None:
+            self.max_delay = max(self.base_delay, float(max_delay))
+        if jitter is not None:
+            self.jitter = min(1.0, max(0.0, float(jitter)))
+        if max_retries is not None:
+            self.max_retries = max(0, int(max_retries))
+        if background_enabled is not None:
+            self.background_enabled = bool(background_enabled)
+        if background_interval is not None:
+            self.background_interval = max(self.base_delay, float(background_interval))
+
+    def reset(self):
+        """Start over from the base delay (call after a successful connect)"""
+        self.attempt = 0
+
+    def in_background(self):
+        """Return True once the fast backoff attempts are used up"""
+        return self.attempt >= self.max_retries
+
+    def next_delay(self):
+        """
+        Consume one attempt and return the delay before it
+
+        Returns:
+            float: Seconds to wait, or None when retrying should stop
+        """
+        if self.in_background():
+            if not self.background_enabled:
+                return None
+            delay = self.background_interval
+        else:
+            delay = min(self.max_delay, self.base_delay * (self.multiplier ** self.attempt))
+
+        self.attempt += 1
+        if self.jitter:
+            # Spread reconnects so many clients do not retry in lockstep
+            delay *= random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+        return delay
+
+
+class DiscordRPCTokenBucket:
+    """
+    Token bucket modelled on Discord's activity rate limit
+    Discord accepts about 5 SET_ACTIVITY calls per 20 seconds. The bucket
+    holds `capacity` tokens and each token comes back `window` seconds after
+    it was used, so no window ever sees more than `capacity` updates (a
+    continuous refill would allow twice that). Each priority leaves a floor
+    of tokens untouched: normal updates keep `reserve` tokens, so critical
+    updates (main menu, game start) still go out immediately after a burst
+    of normal ones, and low-priority updates keep `low_reserve`, so they
+    stop first when updates pile up. Critical updates wait only when the
+    bucket is empty.
+    """
+
+    def __init__(self, capacity=5, window=20.0, reserve=1, low_reserve=2):
+        """
+        Initialize token bucket (starts full)
+
+        Args:
+            capacity (int): Updates allowed per window
+            window (float): Seconds until a used token comes back
+            reserve (int): Tokens only critical updates may use
+            low_reserve (int): Tokens low-priority updates may not use
+        """
+        self._lock = threading.Lock()
+        self._spent = collections.deque()  # time.monotonic() of each token in use
+        self.capacity = self.window = self.reserve = self.low_reserve = None
+        self.configure(capacity, window, reserve, low_reserve)
+
+    def configure(self, capacity, window, reserve=1, low_reserve=None):
+        """
+        Apply new limits (low_reserve defaults to reserve + 1)
+
+        The bucket is refilled only when the limits actually change, so
+        reloading an unchanged config does not hand out extra tokens.
+        """
+        capacity = max(1, int(capacity))
+        window = max(0.0, float(window))
+        reserve = min(max(0, int(reserve)), capacity - 1)
+        if low_reserve is None:
+            low_reserve = reserve + 1
+        low_reserve = min(max(reserve, int(low_reserve)), capacity - 1)
+
+        with self._lock:
+            if (capacity, window, reserve, low_reserve) == (
+                    self.capacity, self.window, self.reserve, self.low_reserve):
+                return
+            self.capacity = capacity
+            self.window = window
+            self.reserve = reserve
+            self.low_reserve = low_reserve
+            self._spent.clear()
+
+    def _refill(self, now):
+        """Return tokens used at least a window ago (lock held)"""
+        while self._spent and now - self._spent[0] >= self.window:
+            self._spent.popleft()
+
+    def _floor(self, priority):
+        if priority >= DiscordRPCPriority.CRITICAL:
+            return 0
+        if priority <= DiscordRPCPriority.LOW:
+            return self.low_reserve
+        return self.reserve
+
+    def try_acquire(self, priority=DiscordRPCPriority.NORMAL):
+        """
+        Take a token if an update of this priority may be sent now
+
+        Args:
+            priority (int): DiscordRPCPriority of the update
+
+        Returns:
+            bool: True if a token was taken
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            if self.capacity - len(self._spent) <= self._floor(priority):
+                return False
+            self._spent.append(now)
+            return True
+
+    def wait_time(self, priority=DiscordRPCPriority.NORMAL):
+        """Return seconds until try_acquire(priority) can succeed (0 if now)"""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            # Tokens that must come back before one above the floor is free
+            needed = len(self._spent) - (self.capacity - self._floor(priority)) + 1
+            if needed <= 0:
+                return 0.0
+            return max(0.0, self._spent[needed - 1] + self.window - now)
+
+    def available(self):
+        """Return the number of tokens left"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.capacity - len(self._spent)
+
+    def drain(self):
+        """Mark every token as used now (Discord reported a rate limit)"""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            while len(self._spent) < self.capacity:
+                self._spent.append(now)
+
+
+class DiscordRPCOutbox:
+    """
+    Single outbound presence pipeline
+    Everything waiting for Discord lives here, reduced on arrival so memory
+    stays bounded no matter how often the game updates:
+      - activity updates are latest-wins
+      - a clear supersedes everything queued before it and is delivered
+        before any update queued after it
+    At most one clear followed by one update is ever held.
+    """
+
+    def __init__(self, on_superseded=None):
+        """
+        Initialize outbox
+
+        Args:
+            on_superseded (callable): Called when a queued update is replaced
+                before it reached Discord
+        """
+        self._lock = threading.Lock()
+        self._clear = False
+        self._update = None  # (kwargs, priority, dedupe)
+        self.on_superseded = on_superseded
+
+    def put_update(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True):
+        """Queue an activity update, replacing any queued one (the higher priority is kept)"""
+        with self._lock:
+            previous = self._update
+            if previous is not None:
+                priority = max(priority, previous[1])
+                if not previous[2]:
+                    # Keep an explicit resend request alive
+                    dedupe = False
+            self._update = (detach_discord_presence(kwargs), priority, dedupe)
+
+        if previous is not None and self.on_superseded:
+            self.on_superseded()
+
+    def put_clear(self):
+        """Queue a presence clear, dropping the queued update"""
+        with self._lock:
+            previous = self._update
+            self._update = None
+            self._clear = True
+
+        if previous is not None and self.on_superseded:
+            self.on_superseded()
+
+    def pop(self):
+        """
+        Take the next operation in delivery order
+
+        Returns:
+            tuple: (action, kwargs, priority, dedupe) with action 'clear' or
+                'update', or None if the outbox is empty
+        """
+        with self._lock:
+            if self._clear:
+                self._clear = False
+                return ('clear', None, DiscordRPCPriority.CRITICAL, False)
+            if self._update is not None:
+                update = self._update
+                self._update = None
+                return ('update',) + update
+            return None
+
+    def take_final(self):
+        """
+        Empty the outbox and return only its final effective state
+
+        Used on (re)connect, where intermediate transitions are meaningless.
+
+        Returns:
+            tuple: Same shape as pop(), or None if nothing was queued
+        """
+        with self._lock:
+            cleared, update = self._clear, self._update
+            self._clear = False
+            self._update = None
+
+        if update is not None:
+            return ('update',) + update
+        if cleared:
+            return ('clear', None, DiscordRPCPriority.CRITICAL, False)
+        return None
+
+    def discard(self):
+        """Drop everything queued"""
+        with self._lock:
+            self._clear = False
+            self._update = None
+
+    def __len__(self):
+        with self._lock:
+            return int(self._clear) + int(self._update is not None)
+
+
+class DiscordRPCPreparedPresence(dict):
+    """
+    Presence payload that already went through _prepare_presence_payload
+    Assets are mapped, strings truncated and the fingerprint precomputed,
+    so the send path uses it as is. Read-only, since one instance is shared
+    by the prepared cache and every queue it passes through: changing it
+    raises TypeError, and copy() returns a plain dict that can be edited.
+    """
+
+    __slots__ = ('fingerprint',)
+
+    def __init__(self, payload, fingerprint):
+        super().__init__(payload)
+        self.fingerprint = fingerprint
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("prepared presence is read-only; edit a copy() instead")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    update = pop = popitem = clear = setdefault = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        # Pickled (saves, rollback) as a plain dict; the default would refill it through __setitem__
+        return (dict, (dict(self),))
+
+
+def detach_discord_presence(kwargs):
+    """
+    Return a presence dict that later changes to kwargs cannot affect
+
+    Prepared payloads are read-only and kept by identity; anything else is
+    copied.
+
+    Args:
+        kwargs (dict): Presence arguments or a DiscordRPCPreparedPresence
+
+    Returns:
+        dict: kwargs itself if prepared, otherwise a shallow copy
+    """
+    if isinstance(kwargs, DiscordRPCPreparedPresence):
+        return kwargs
+    return kwargs.copy()
+
+
+class DiscordRPCBatch:
+    """
+    Presence changes collected by `with discord_rpc.batch():`
+    Updates made on the batch's thread are merged field by field (later
+    calls win) and a clear drops everything before it. When the outermost
+    block exits without an exception the result is submitted once; nested
+    blocks add to the outermost one.
+    """
+
+    def __init__(self, discord_rpc_instance):
+        """
+        Initialize batch
+
+        Args:
+            discord_rpc_instance: The main DiscordRPC instance
+        """
+        self.discord_rpc = discord_rpc_instance
+        self._outer = None
+        self.cleared = False
+        self.fields = None  # Merged presence, None until the first update
+        self.single = None  # The only update, sent as is (keeps prepared payloads)
+        self.updates = 0
+        self.priority = DiscordRPCPriority.LOW
+        self.dedupe = True
+        self.result = None
+
+    def add_update(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True):
+        """Merge an update into the batch (the highest priority is kept)."""
+        if self.fields is None:
+            self.fields = {}
+        self.fields.update(kwargs)
+        self.single = kwargs if self.updates == 0 else None
+        self.updates += 1
+        self.priority = max(self.priority, priority)
+        self.dedupe = self.dedupe and dedupe
+        self.discord_rpc.metrics.increment('updates_batched')
+        return True
+
+    def add_clear(self):
+        """Record a clear; updates made before it are dropped."""
+        self.cleared = True
+        self.fields = None
+        self.single = None
+        self.updates = 0
+        self.priority = DiscordRPCPriority.LOW
+        self.dedupe = True
+        return True
+
+    def commit(self):
+        """
+        Submit the batch: the clear (if any), then one merged update
+
+        Returns:
+            bool: Result of the last submission, None if the batch was empty
+        """
+        result = None
+        if self.cleared:
+            result = self.discord_rpc.clear_presence()
+        if self.fields is not None:
+            payload = self.single if self.updates == 1 else self.fields
+            result = self.discord_rpc._submit_presence(payload, priority=self.priority, dedupe=self.dedupe)
+        return result
+
+    def __enter__(self):
+        batches = self.discord_rpc._batches
+        thread_id = threading.get_ident()
+        self._outer = batches.get(thread_id)
+        if self._outer is None:
+            batches[thread_id] = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        if self._outer is not None:
+            return False
+        self.discord_rpc._batches.pop(threading.get_ident(), None)
+        if exc_type is None:
+            self.result = self.commit()
+        return False
+
+
+class DiscordRPCScheduler:
+    """
+    Single scheduler thread for delayed RPC work
+    Replaces a threading.Timer per delayed action. Tasks are keyed: scheduling
+    a key that is already pending replaces (or keeps) that task instead of
+    adding another, and cancel() drops it. Short tasks run on the scheduler
+    thread; blocking ones (connection attempts, health probes) run on at most
+    max_workers worker threads and wait for a free worker otherwise.
+    """
+
+    def __init__(self, max_workers=DISCORD_SCHEDULER_MAX_WORKERS):
+        """
+        Initialize scheduler
+
+        Args:
+            max_workers (int): Max threads running blocking tasks at once
+        """
+        self.max_workers = max(1, max_workers)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._stopped = False
+        self._heap = []  # (due, sequence, key)
+        self._tasks = {}  # key -> (due, sequence, callback, blocking)
+        self._sequence = 0
+        self._ready = collections.deque()  # (key, callback) waiting for a worker
+        self._active = {}  # key -> thread running it
+        self._workers = 0
+
+    def start(self):
+        """Start the scheduler thread if it is not running yet (not after stop)"""
+        with self._cond:
+            if self._stopped or (self._thread and self._thread.is_alive()):
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="DiscordRPCScheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """
+        Drop pending tasks and stop the scheduler thread for good
+
+        Tasks already running are not interrupted; the call waits up to
+        timeout for them and for the thread to exit.
+
+        Args:
+            timeout (float): Max seconds to wait
+        """
+        self.request_stop()
+        self.join(timeout)
+
+    def request_stop(self):
+        """Drop pending tasks and tell the threads to exit, without waiting"""
+        with self._cond:
+            self._stopped = True
+            self._running = False
+            self._heap = []
+            self._tasks.clear()
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def join(self, timeout):
+        """
+        Wait for the scheduler thread and running tasks after request_stop()
+
+        Returns:
+            bool: True if everything finished in time
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        with self._cond:
+            while self._busy_elsewhere() and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            finished = not self._busy_elsewhere()
+
+        if not finished or (thread and thread.is_alive() and thread is not threading.current_thread()):
+            print("Warning: Scheduler did not terminate cleanly")
+            return False
+        return True
+
+    def schedule(self, key, delay, callback, blocking=False, replace=True):
+        """
+        Run callback after delay seconds
+
+        Args:
+            key (str): Task identity, at most one pending task per key
+            delay (float): Seconds from now
+            callback (callable): Called without arguments
+            blocking (bool): Run on a worker thread instead of the scheduler thread
+            replace (bool): Replace a pending task with the same key; if False
+                the pending one is kept, with 'earlier' it is replaced only
+                if the new task is due sooner
+
+        Returns:
+            bool: True if scheduled, False if a pending task was kept or the
+                scheduler was stopped
+        """
+        self.start()
+
+        with self._cond:
+            due = time.monotonic() + max(0.0, delay)
+            pending = self._tasks.get(key)
+            if self._stopped or (pending and (not replace or (replace == 'earlier' and pending[0] <= due))):
+                return False
+            self._sequence += 1
+            self._tasks[key] = (due, self._sequence, callback, blocking)
+            heapq.heappush(self._heap, (due, self._sequence, key))
+            self._cond.notify_all()
+            return True
+
+    def cancel(self, key):
+        """
+        Drop the pending task with this key (a running one is not interrupted)
+
+        Returns:
+            bool: True if a task was pending
+        """
+        with self._cond:
+            # The heap entry stays and is skipped when it comes up
+            return self._tasks.pop(key, None) is not None
+
+    def is_pending(self, key):
+        """Return True while a task with this key waits to run"""
+        with self._cond:
+            return key in self._tasks or any(ready_key == key for ready_key, _ in self._ready)
+
+    def is_active(self, key):
+        """Return True while a task with this key is pending or running"""
+        with self._cond:
+            return key in self._active or key in self._tasks or any(ready_key == key for ready_key, _ in self._ready)
+
+    def wait(self, key, timeout=None):
+        """
+        Wait until no task with this key is pending or running
+
+        Returns immediately when called from the task itself.
+
+        Returns:
+            bool: True if the key went idle in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._active.get(key) not in (None, threading.current_thread()) or key in self._tasks \
+                    or any(ready_key == key for ready_key, _ in self._ready):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def pending_count(self):
+        """Return the number of tasks waiting to run"""
+        with self._cond:
+            return len(self._tasks) + len(self._ready)
+
+    def worker_count(self):
+        """Return the number of worker threads currently running"""
+        with self._cond:
+            return self._workers
+
+    def _busy_elsewhere(self):
+        current = threading.current_thread()
+        return any(thread is not current for thread in self._active.values())
+
+    def _run(self):
+        """Scheduler loop: sleep until the earliest due task, then dispatch it"""
+        while True:
+            with self._cond:
+                while self._running:
+                    while self._heap and self._tasks.get(self._heap[0][2], (None, None))[1] != self._heap[0][1]:
+                        # Cancelled or replaced entry
+                        heapq.heappop(self._heap)
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+
+                if not self._running:
+                    return
+
+                _, _, key = heapq.heappop(self._heap)
+                _, _, callback, blocking = self._tasks.pop(key)
+                if blocking:
+                    self._ready.append((key, callback))
+                    self._start_worker()
+                    continue
+                self._active[key] = threading.current_thread()
+
+            self._call(key, callback)
+
+    def _start_worker(self):
+        """Start a worker for ready tasks if the bound allows (lock held)"""
+        if self._workers >= self.max_workers or not self._ready:
+            return
+        self._workers += 1
+        worker = threading.Thread(target=self._work, name="DiscordRPCWorker", daemon=True)
+        worker.start()
+
+    def _work(self):
+        """Worker loop: run ready blocking tasks, exit when none are left"""
+        while True:
+            with self._cond:
+                if not self._ready or not self._running:
+                    self._workers -= 1
+                    self._cond.notify_all()
+                    return
+                key, callback = self._ready.popleft()
+                self._active[key] = threading.current_thread()
+
+            self._call(key, callback)
+
+    def _call(self, key, callback):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Discord RPC scheduled task '{key}' failed: {e}")
+        finally:
+            with self._cond:
+                if self._active.get(key) is threading.current_thread():
+                    del self._active[key]
+                self._cond.notify_all()
+
+
+class DiscordRPCPresenceWriter:
+    """
+    Dedicated presence writer thread
+    Owns the connection and performs all Discord IPC requests, so callers only
+    put work into the outbox and return immediately
+    """
+
+    def __init__(self, discord_rpc_instance):
+        """
+        Initialize presence writer
+
+        Args:
+            discord_rpc_instance: The main DiscordRPC instance
+        """
+        self.discord_rpc = discord_rpc_instance
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # Pending work (presence lives in the outbox, flags for connection control)
+        self._deliver_requested = False
+        self._connect_requested = False
+        self._close_requested = False
+
+        # Request tickets used by flush()
+        self._submitted = 0
+        self._completed = 0
+
+    def start(self):
+        """Start the writer thread if it is not running yet"""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="DiscordRPCWriter", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """
+        Stop the writer thread after it finishes the current request
+
+        Args:
+            timeout (float): Max seconds to wait for the thread to exit
+        """
+        self.request_stop()
+        self.join(timeout)
+
+    def request_stop(self):
+        """Tell the writer thread to exit after the current request, without waiting"""
+        with self._cond:
+            self._running = False
+            self._deliver_requested = False
+            self._connect_requested = False
+            self._cond.notify_all()
+
+    def join(self, timeout):
+        """
+        Wait for the writer thread after request_stop()
+
+        Returns:
+            bool: True if the thread exited in time
+        """
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=max(0.0, timeout))
+            if thread.is_alive():
+                print("Warning: Presence writer thread did not terminate cleanly")
+                return False
+        return True
+
+    def is_alive(self):
+        """Return True while the writer thread is running"""
+        thread = self._thread
+        return bool(thread and thread.is_alive())
+
+    def is_writer_thread(self):
+        """Return True when called from the writer thread itself"""
+        return threading.current_thread() is self._thread
+
+    def submit_update(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True):
+        """Queue a presence update in the outbox and wake the writer"""
+        self.discord_rpc.outbox.put_update(kwargs, priority=priority, dedupe=dedupe)
+        return self._post(deliver=True)
+
+    def submit_clear(self):
+        """Queue a presence clear in the outbox and wake the writer"""
+        self.discord_rpc.outbox.put_clear()
+        return self._post(deliver=True)
+
+    def request_connect(self):
+        """Ask the writer to (re)connect to Discord"""
+        return self._post(connect=True)
+
+    def request_close(self):
+        """Ask the writer to close the connection, dropping queued work"""
+        return self._post(close=True)
+
+    def _post(self, deliver=False, connect=False, close=False):
+        """Store a request and wake the writer. Returns the request ticket."""
+        self.start()
+
+        with self._cond:
+            if close:
+                self._close_requested = True
+                self._connect_requested = False
+                self._deliver_requested = False
+                self.discord_rpc.outbox.discard()
+            if connect:
+                self._connect_requested = True
+            if deliver:
+                self._deliver_requested = True
+
+            self._submitted += 1
+            ticket = self._submitted
+            self._cond.notify_all()
+            return ticket
+
+    def flush(self, timeout=None):
+        """
+        Wait until every request submitted so far has been delivered
+
+        Args:
+            timeout (float): Max seconds to wait, None waits forever
+
+        Returns:
+            bool: True if all requests were processed in time
+        """
+        if self.is_writer_thread():
+            return False
+
+        with self._cond:
+            target = self._submitted
+            self._cond.wait_for(
+                lambda: self._completed >= target or not self._running,
+                timeout
+            )
+            return self._completed >= target
+
+    def _run(self):
+        """Writer thread main loop"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: (not self._running or self._close_requested or
+                             self._connect_requested or self._deliver_requested)
+                )
+
+                if not self._running:
+                    self._completed = self._submitted
+                    self._cond.notify_all()
+                    return
+
+                ticket = self._submitted
+                close = self._close_requested
+                connect = self._connect_requested
+                deliver = self._deliver_requested
+                self._close_requested = False
+                self._connect_requested = False
+                self._deliver_requested = False
+
+            try:
+                if close:
+                    self.discord_rpc._close_connection_internal()
+                if connect:
+                    self.discord_rpc._connect_thread()
+                if deliver:
+                    self.discord_rpc._deliver_outbox()
+            except Exception as e:
+                print(f"Discord RPC writer error: {e}")
+            finally:
+                with self._cond:
+                    self._completed = max(self._completed, ticket)
+                    self._cond.notify_all()
+
+
 class DiscordRPC:
     """
     Main Discord RPC class for RenPy integration
@@ -84,14 +1078,14 @@ class DiscordRPC:
         """
         # Initialize with default client_id, will be updated later
         self.client_id = client_id or DISCORD_DEFAULT_CLIENT_ID
-        self.rpc = None
+        self.ipc = discord_ipc  # Process-wide IPC engine
         self.status = DiscordRPCStatus.DISABLED
         self.enabled = False
         self.connected = False
-        self.connection_thread = None
-        self.last_update = {}
+        self.last_update = {}  # Latest presence the game asked for
+        self._presence_cleared = False  # True after clear_presence() until the next update
         self.retry_count = 0
-        self._retry_timer = None
+        self.reconnect_policy = DiscordRPCReconnectPolicy()
         
         # Thread safety
         self._lock = threading.RLock()
@@ -100,33 +1094,40 @@ class DiscordRPC:
         # Load settings from config with safe defaults
         self.max_retries = 3
         self.retry_delay = 5.0
-        self.startup_sync_enabled = True
+        self.startup_sync_enabled = False
         self.startup_timeout = 5.0
+        self.startup_cost = None  # Seconds init_discord_rpc() spent on the game thread
+        self.shutdown_duration = None  # Seconds the last shutdown() took
+        self.shutdown_timeout = DISCORD_SHUTDOWN_TIMEOUT
+        self._attempt_settled = threading.Event()  # Set when a connection attempt finished
+        self._startup_wait_done = False
         self.connection_timeout = 30.0
-        self.max_pending_updates = 10
+        self.update_timeout = 10.0
         self.rate_limit_enabled = True
-        self.rate_limit_interval = 10.0
-        self._last_presence_update_time = 0.0
+        self.rate_limiter = DiscordRPCTokenBucket()
+        self._throttled_update = None  # (kwargs, priority, seq) of the newest update held back by the rate limiter
+        self._update_seq = itertools.count(1)  # Orders sends against the held update
+        self.metrics = DiscordRPCMetrics()
+        self.outbox = DiscordRPCOutbox(on_superseded=self._note_coalesced_update)
+        self._last_sent_fingerprint = None  # Fingerprint of the payload Discord acknowledged
+        self.defer_while_skipping = True
+        self.throttle_auto_forward = True
+        self._deferred_update = None  # Newest update held back while skipping
+        self._restore_pending = False  # Show the recorded state at the next interaction
+        self._prepared_cache = {}  # key -> (config version, game name, prepared payload)
+        self._batches = {}  # thread id -> open DiscordRPCBatch
+        self.writer_thread_enabled = True
+        self._writer = DiscordRPCPresenceWriter(self)
+        self.scheduler = DiscordRPCScheduler()  # Retries, trailing sends, connection attempts, health checks
 
         self.last_error = None
         self.connection_start_time = None
         self.status_callbacks = []  # List of callbacks (RenPy compatible)
-        self.pending_updates = Queue(maxsize=DISCORD_QUEUE_MAX_SIZE)  # Thread-safe queue
+        self.presence_callbacks = []  # Called for every presence the game requests
         self._shutdown_flag = False
 
-    def _create_rpc_loop(self):
-        """Create and bind an event loop for the current RPC worker thread."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop
-
-    def _bind_rpc_loop(self, rpc):
-        """Bind an RPC object's loop to the current thread before using it."""
-        loop = getattr(rpc, 'loop', None)
-        if loop and not loop.is_closed():
-            asyncio.set_event_loop(loop)
-            return True
-        return False
+        self.ipc.connection_lost_callbacks.append(self._on_ipc_connection_lost)
+        discord_config_snapshot.invalidate_callbacks.append(self._load_settings)
 
     def _is_placeholder_client_id(self, client_id):
         """Return True for empty/default placeholder client IDs."""
@@ -138,24 +1139,6 @@ class DiscordRPC:
             return False
         return str(client_id).isdigit() and 17 <= len(str(client_id)) <= 19
 
-    def _resize_pending_queue(self, max_size):
-        """Resize pending update queue while preserving queued updates."""
-        try:
-            max_size = max(1, int(max_size))
-        except Exception:
-            max_size = DISCORD_QUEUE_MAX_SIZE
-
-        with self._lock:
-            old_queue = self.pending_updates
-            new_queue = Queue(maxsize=max_size)
-
-            while old_queue and not old_queue.empty() and not new_queue.full():
-                try:
-                    new_queue.put_nowait(old_queue.get_nowait())
-                except Exception:
-                    break
-
-            self.pending_updates = new_queue
         
     def _load_config(self):
         """Load configuration after init phase"""
@@ -170,19 +1153,55 @@ class DiscordRPC:
                 self.client_id = config_client_id
             else:
                 self.client_id = DISCORD_DEFAULT_CLIENT_ID
-                
-            # Load other settings
+
+            self.writer_thread_enabled = get_discord_config('connection.writer_thread_enabled', True)
+        except Exception as e:
+            print(f"Warning: Failed to load Discord RPC config: {e}")
+
+        self._load_settings()
+
+    def _load_settings(self):
+        """
+        Load the settings that can change while the game runs
+
+        Called by _load_config() and on every invalidate_discord_config(),
+        so retries, timeouts and rate limits follow runtime changes to
+        discord_config. The client ID (see apply_discord_rpc_settings())
+        and connection.writer_thread_enabled are only read at startup.
+        """
+        try:
             self.max_retries = get_discord_config('connection.max_retries', 3)
             self.retry_delay = get_discord_config('connection.retry_delay', 5.0)
-            self.startup_sync_enabled = get_discord_config('connection.startup_sync_enabled', True)
-            if hasattr(persistent, 'discord_rpc_sync_startup'):
-                self.startup_sync_enabled = persistent.discord_rpc_sync_startup
+            self.reconnect_policy.configure(
+                base_delay=self.retry_delay,
+                multiplier=get_discord_config('connection.retry_backoff', 2.0),
+                max_delay=get_discord_config('connection.retry_max_delay', 60.0),
+                jitter=get_discord_config('connection.retry_jitter', 0.2),
+                max_retries=self.max_retries,
+                background_enabled=get_discord_config('connection.background_retry_enabled', True),
+                background_interval=get_discord_config('connection.background_retry_interval', 120.0),
+            )
+            # persistent.discord_rpc_sync_startup is folded into the config snapshot
+            self.startup_sync_enabled = get_discord_config('connection.startup_sync_enabled', False)
             self.startup_timeout = get_discord_config('connection.startup_timeout', 5.0)
             self.connection_timeout = get_discord_config('connection.connection_timeout', 30.0)
-            self.max_pending_updates = get_discord_config('queue.max_pending_updates', 10)
+            self.update_timeout = get_discord_config('connection.update_timeout', 10.0)
+            self.shutdown_timeout = get_discord_config('connection.shutdown_timeout', DISCORD_SHUTDOWN_TIMEOUT)
             self.rate_limit_enabled = get_discord_config('rate_limiting.enabled', True)
-            self.rate_limit_interval = get_discord_config('rate_limiting.min_interval', 10.0)
-            self._resize_pending_queue(self.max_pending_updates)
+            burst = get_discord_config('rate_limiting.burst', None)
+            legacy_interval = get_discord_config('rate_limiting.min_interval', None)
+            if burst is None and legacy_interval:
+                # Old configs: one update per min_interval
+                self.rate_limiter.configure(1, legacy_interval, reserve=0, low_reserve=0)
+            else:
+                self.rate_limiter.configure(
+                    burst or 5,
+                    get_discord_config('rate_limiting.window', 20.0),
+                    reserve=get_discord_config('rate_limiting.forced_reserve', 1),
+                    low_reserve=get_discord_config('rate_limiting.low_priority_reserve', None),
+                )
+            self.defer_while_skipping = get_discord_config('rate_limiting.defer_while_skipping', True)
+            self.throttle_auto_forward = get_discord_config('rate_limiting.throttle_auto_forward', True)
         except Exception as e:
             print(f"Warning: Failed to load Discord RPC config: {e}")
         
@@ -216,6 +1235,9 @@ class DiscordRPC:
                 - retry_count (int): Number of retry attempts
                 - last_error (str): Last error message or None
                 - color (str): Hex color code for status display
+                - updates_sent (int): Presence updates delivered to Discord
+                - updates_coalesced (int): Throttled updates merged into a later send
+                - updates_deduplicated (int): Updates skipped because Discord already shows them
         """
         return {
             'status': self.status,
@@ -223,9 +1245,34 @@ class DiscordRPC:
             'connected': self.connected,
             'retry_count': self.retry_count,
             'last_error': self.last_error,
-            'color': DiscordRPCStatus.get_color(self.status)
+            'color': DiscordRPCStatus.get_color(self.status),
+            'updates_sent': self.metrics.get('updates_sent'),
+            'updates_coalesced': self.metrics.get('updates_coalesced'),
+            'updates_deduplicated': self.metrics.get('updates_deduplicated')
         }
 
+    def get_metrics(self):
+        """
+        Get a snapshot of the runtime metrics
+
+        Returns:
+            dict: See DiscordRPCMetrics.snapshot(), plus:
+                - status (str): Current status text
+                - connected (bool): Whether connected to Discord
+                - pending_updates (int): Presence changes waiting in the outbox (0-2)
+                - scheduled_tasks (int): Delayed tasks waiting in the scheduler
+                - worker_threads (int): Threads running blocking scheduled tasks
+                - startup_cost_ms (float): Game-thread time spent in init_discord_rpc()
+        """
+        snapshot = self.metrics.snapshot()
+        snapshot['status'] = self.status
+        snapshot['connected'] = self.connected
+        snapshot['pending_updates'] = len(self.outbox)
+        snapshot['scheduled_tasks'] = self.scheduler.pending_count()
+        snapshot['worker_threads'] = self.scheduler.worker_count()
+        snapshot['startup_cost_ms'] = self.startup_cost * 1000.0 if self.startup_cost is not None else None
+        return snapshot
+
     def add_status_callback(self, callback):
         """
         Add callback for status changes
@@ -258,6 +1305,42 @@ class DiscordRPC:
             except Exception as e:
                 print(f"Status callback error: {e}")
 
+    def add_presence_callback(self, callback):
+        """
+        Add callback for presence requests
+
+        Called on the requesting thread for every update_presence() /
+        clear_presence() the game makes (a batch counts once, when it is
+        submitted), before rate limiting or queueing.
+
+        Args:
+            callback (callable): Function to call on a presence request.
+                Signature: callback(kwargs), with {} for a clear
+        """
+        if callback not in self.presence_callbacks:
+            self.presence_callbacks.append(callback)
+
+    def remove_presence_callback(self, callback):
+        """
+        Remove presence callback
+
+        Args:
+            callback (callable): Previously registered callback to remove
+        """
+        if callback in self.presence_callbacks:
+            self.presence_callbacks.remove(callback)
+
+    def _notify_presence_request(self, kwargs):
+        """Notify all callbacks about a presence request"""
+        with self._lock:
+            callbacks = list(self.presence_callbacks)
+
+        for callback in callbacks:
+            try:
+                callback(kwargs)
+            except Exception as e:
+                print(f"Presence callback error: {e}")
+
     def _set_status(self, new_status, error=None):
         """Internal method to set status and notify callbacks"""
         with self._lock:
@@ -272,9 +1355,9 @@ class DiscordRPC:
         Enable Discord RPC and attempt connection
         
         Returns:
-            bool: True if connection started, False if pypresence unavailable
+            bool: True if connection started, False if Discord IPC is unavailable
         """
-        if not PYPRESENCE_AVAILABLE:
+        if not DISCORD_IPC_AVAILABLE:
             self.status = DiscordRPCStatus.ERROR
             return False
 
@@ -301,37 +1384,46 @@ class DiscordRPC:
         self._set_status(DiscordRPCStatus.DISABLED)
 
     def _cancel_retry_timer(self):
-        """Cancel pending retry timer if one exists."""
-        with self._lock:
-            timer = self._retry_timer
-            self._retry_timer = None
-
-        if timer:
-            try:
-                timer.cancel()
-            except Exception:
-                pass
+        """Cancel the pending reconnect if one is scheduled."""
+        self.scheduler.cancel('retry')
 
     def _schedule_retry(self):
-        """Schedule reconnect through public connect path."""
+        """
+        Schedule reconnect through public connect path
+
+        The delay comes from the reconnect policy: exponential backoff with
+        jitter, then low-frequency background attempts.
+
+        Returns:
+            bool: True if a retry was scheduled, False if the policy gave up
+        """
         self._cancel_retry_timer()
 
+        with self._lock:
+            was_background = self.reconnect_policy.in_background()
+            delay = self.reconnect_policy.next_delay()
+
+        if delay is None:
+            print(f"Discord RPC connection failed after {self.max_retries} attempts")
+            self._set_status(DiscordRPCStatus.ERROR)
+            return False
+        if not was_background and self.reconnect_policy.in_background() and self.reconnect_policy.background_enabled:
+            print(f"Discord RPC not reachable, retrying in the background every ~{self.reconnect_policy.background_interval:.0f}s")
+
         def retry_connect():
             with self._lock:
-                self._retry_timer = None
                 should_retry = self.enabled and not self._shutdown_flag
 
             if should_retry:
                 self.connect(sync_startup=False)
 
         self._set_status(DiscordRPCStatus.RECONNECTING)
-        timer = threading.Timer(self.retry_delay, retry_connect)
-        timer.daemon = True
 
         with self._lock:
             if self.enabled and not self._shutdown_flag:
-                self._retry_timer = timer
-                timer.start()
+                self.scheduler.schedule('retry', delay, retry_connect)
+                return True
+        return False
 
     def connect(self, sync_startup=None):
         """
@@ -341,7 +1433,7 @@ class DiscordRPC:
             sync_startup (bool): If True, wait for connection during startup
         Returns True if connection successful or in progress
         """
-        if not self.enabled or not PYPRESENCE_AVAILABLE:
+        if not self.enabled or not DISCORD_IPC_AVAILABLE:
             return False
 
         if not self._is_valid_client_id(self.client_id):
@@ -363,116 +1455,368 @@ class DiscordRPC:
         try:
             self._cancel_retry_timer()
 
-            with self._lock:
-                if self.connection_thread and self.connection_thread.is_alive():
-                    return True
+            if self.scheduler.is_active('connect'):
+                return True
 
             self.connection_start_time = time.time()
+            self._attempt_settled.clear()
             self._set_status(DiscordRPCStatus.CONNECTING)
 
-            # Determine if we should sync during startup
-            should_sync = sync_startup if sync_startup is not None else self.startup_sync_enabled
+            # Determine if we should sync during startup
+            should_sync = sync_startup if sync_startup is not None else self.startup_sync_enabled
+
+            if self.writer_thread_enabled:
+                # The writer thread owns the connection; never wait on ourselves
+                self._writer.request_connect()
+                if should_sync and not self._writer.is_writer_thread():
+                    if not self._writer.flush(timeout=self.startup_timeout):
+                        print(f"Discord RPC startup sync timeout ({self.startup_timeout}s), continuing in background")
+                return True
+
+            if should_sync:
+                # Try synchronous connection first (with timeout)
+                return self._connect_sync_with_timeout()
+            else:
+                # Asynchronous connection
+                self.scheduler.schedule('connect', 0, self._connect_thread, blocking=True, replace=False)
+                return True
+        finally:
+            self._connection_lock.release()
+
+    def _connect_sync_with_timeout(self):
+        """
+        Try synchronous connection with timeout for startup
+        Runs the attempt as the single 'connect' task to avoid duplicate live connections
+        """
+        self.scheduler.schedule('connect', 0, self._connect_thread, blocking=True, replace=False)
+
+        # Wait with timeout
+        if not self._attempt_settled.wait(timeout=self.startup_timeout):
+            print(f"Discord RPC startup sync timeout ({self.startup_timeout}s), continuing in background")
+
+        return True
+        
+    def _connect_thread(self):
+        """Internal connection thread"""
+        try:
+            self._connect_attempt()
+        finally:
+            # Wake wait_until_ready() whether the attempt succeeded or not
+            self._attempt_settled.set()
+
+    def _connect_attempt(self):
+        """Perform one connection attempt and send the initial presence"""
+        if self._shutdown_flag or not self.enabled:
+            return
+            
+        try:
+            # The engine drops any previous socket before the handshake
+            started = time.perf_counter()
+            self.ipc.call(
+                self.ipc.connect(self.client_id, timeout=self.connection_timeout),
+                timeout=self.connection_timeout + 1.0
+            )
+            self.metrics.observe('connect_time', time.perf_counter() - started)
+            if self.metrics.get('connects'):
+                self.metrics.increment('reconnects')
+            self.metrics.increment('connects')
+            
+            with self._lock:
+                # Updates queued before this are in the outbox for _restore_presence(),
+                # later ones see the connection (see _route_presence())
+                self.connected = True
+                self.retry_count = 0
+                self.reconnect_policy.reset()
+                self._last_sent_fingerprint = None
+            
+            self._set_status(DiscordRPCStatus.CONNECTED)
+            
+            self._restore_presence()
+            
+        except Exception as e:
+            self.metrics.increment('connect_failures')
+            with self._lock:
+                self.connected = False
+                self.retry_count += 1
+                current_retry = self.retry_count
+            
+            self._set_status(DiscordRPCStatus.ERROR, e)
+            if isinstance(e, DiscordIPCAuthError):
+                # Same client ID, same answer: wait for connect() with a new one
+                print(f"Discord RPC client ID rejected by Discord, not retrying: {e}")
+                return
+            print(f"Discord RPC connection error (attempt {current_retry}): {e}")
+
+            if self.enabled and not self._shutdown_flag:
+                self._schedule_retry()
+                
+    def _restore_presence(self):
+        """
+        Send the final effective presence on a fresh connection
+
+        Whatever piled up in the outbox while disconnected collapses to one
+        write: the newest update, nothing if the game cleared its presence
+        last, the last requested presence after a reconnect, or the main
+        menu presence on the very first connection.
+        """
+        final = self.outbox.take_final()
+        if final is not None:
+            action, kwargs, priority, dedupe = final
+            if action == 'update':
+                self._update_presence_internal(kwargs, priority=DiscordRPCPriority.CRITICAL)
+            # A new connection shows no activity, so a final clear needs no write
+            return
+
+        with self._lock:
+            if self._presence_cleared:
+                return
+            presence = self.last_update or None
+
+        if not presence:
+            presence = self.get_prepared_template('main_menu_presence')
+        if not presence:
+            presence = {
+                'state': 'В главном меню',
+                'details': config.name or 'RenPy Game',
+                'large_image': 'game_icon',
+                'large_text': config.name or 'RenPy Game'
+            }
+        self._update_presence_internal(presence, priority=DiscordRPCPriority.CRITICAL)
+
+    def _deliver_outbox(self):
+        """Send queued presence changes in order while connected"""
+        while True:
+            with self._lock:
+                is_connected = self.connected
+            if not is_connected:
+                # Whatever is left is restored by the next connection
+                return
+
+            operation = self.outbox.pop()
+            if operation is None:
+                return
+
+            action, kwargs, priority, dedupe = operation
+            if action == 'clear':
+                self._clear_presence_internal()
+            else:
+                self._update_presence_internal(kwargs, priority=priority, dedupe=dedupe)
+
+    def queue_presence(self, kwargs):
+        """
+        Queue a presence update for delivery once connected
+
+        Used when the caller knows Discord is unavailable; the update is
+        restored on the next successful connection (latest wins).
+
+        Args:
+            kwargs (dict): Presence data, same keys as update_presence()
+
+        Returns:
+            bool: True if queued or sent
+        """
+        with self._lock:
+            is_connected = self.connected
+        if is_connected:
+            return self.update_presence(**kwargs)
+
+        self._remember_presence(kwargs)
+        self.outbox.put_update(kwargs, priority=DiscordRPCPriority.CRITICAL)
+        self.metrics.increment('updates_queued')
+        return True
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the current connection attempt to finish
+
+        Startup never blocks on Discord; call this only where the first
+        presence matters. Returns early when Discord is not running, since
+        the attempt then fails immediately.
+
+        Args:
+            timeout (float): Max seconds to wait (default: connection.startup_timeout)
+
+        Returns:
+            bool: True if connected to Discord
+        """
+        if self.connected:
+            return True
+        if not self.enabled or self._writer.is_writer_thread():
+            return False
+        if self.status not in [DiscordRPCStatus.CONNECTING, DiscordRPCStatus.RECONNECTING]:
+            return False
+
+        self._attempt_settled.wait(self.startup_timeout if timeout is None else timeout)
+        return self.connected
+
+    def wait_for_startup(self):
+        """
+        Bounded one-time wait for the startup connection
+
+        Used when the first presence is shown (main menu) if
+        startup_sync_enabled / persistent.discord_rpc_sync_startup is on.
+
+        Returns:
+            bool: True if connected to Discord
+        """
+        if not self.startup_sync_enabled or self._startup_wait_done:
+            return self.connected
+        self._startup_wait_done = True
+
+        started = time.perf_counter()
+        ready = self.wait_until_ready(self.startup_timeout)
+        waited = time.perf_counter() - started
+        if waited > 0.01:
+            print(f"Discord RPC startup wait: {waited * 1000:.0f} ms (connected: {ready})")
+        return ready
+
+    def disconnect(self):
+        """Disconnect from Discord RPC and clear presence"""
+        self._shutdown_flag = True
+        self._cancel_retry_timer()
+        self._cancel_trailing_send()
+        
+        with self._lock:
+            self.connected = False
+        self.outbox.discard()
+
+        if self._writer.is_alive():
+            # Let the writer close the connection it owns
+            self._writer.request_close()
+            if not self._writer.flush(timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+                print("Warning: Presence writer did not close the connection in time")
+        else:
+            self._close_ipc()
+            
+        # Wait for a connection attempt in progress to finish (with timeout)
+        self.scheduler.cancel('connect')
+        if not self.scheduler.wait('connect', timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+            print("Warning: Connection attempt did not terminate cleanly")
+
+        self._set_status(DiscordRPCStatus.DISCONNECTED)
+        self._shutdown_flag = False
+
+    def _close_connection_internal(self):
+        """Close the connection from the writer thread"""
+        with self._lock:
+            self.connected = False
+        self._close_ipc()
+
+    def _on_ipc_connection_lost(self, error):
+        """Called on the IPC loop thread when Discord drops the socket"""
+        self._on_connection_error(error or DiscordIPCTransportError("Connection to Discord lost"))
+
+    def _on_connection_error(self, error):
+        """
+        Mark the connection lost and schedule its recovery
+
+        Whoever sees the connection drop first (the IPC read loop or a failed
+        request) schedules the single reconnect; it runs on the scheduler,
+        never on the calling thread. A rejected client ID is not retried.
+
+        Args:
+            error (Exception): Transport, rate limit or auth error that ended
+                the connection
+        """
+        with self._lock:
+            was_connected = self.connected
+            self.connected = False
+            self._last_sent_fingerprint = None
+            self.last_error = str(error)
+
+        if self._shutdown_flag or not self.enabled:
+            return
+
+        if isinstance(error, DiscordIPCRateLimitError):
+            # The reconnect must not spend a token Discord has not given back yet
+            self.rate_limiter.drain()
+
+        if isinstance(error, DiscordIPCAuthError):
+            self._cancel_retry_timer()
+            print(f"Discord RPC client ID rejected by Discord, not retrying: {error}")
+            self._set_status(DiscordRPCStatus.ERROR, error)
+            return
+
+        if was_connected:
+            print(f"Discord RPC connection lost: {error}")
+            self._schedule_retry()
+
+    def flush_presence(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """
+        Wait until queued presence changes have been delivered to Discord
+
+        Args:
+            timeout (float): Max seconds to wait, None waits forever
+
+        Returns:
+            bool: True if the writer caught up in time (always True without writer thread)
+        """
+        if not self._writer.is_alive():
+            return True
+        return self._writer.flush(timeout=timeout)
+
+    def stop_writer(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """Stop the presence writer thread (used on game exit)"""
+        self._writer.stop(timeout=timeout)
 
-            if should_sync:
-                # Try synchronous connection first (with timeout)
-                return self._connect_sync_with_timeout()
-            else:
-                # Asynchronous connection
-                with self._lock:
-                    self.connection_thread = threading.Thread(target=self._connect_thread, daemon=True)
-                    self.connection_thread.start()
-                return True
-        finally:
-            self._connection_lock.release()
+    def stop_scheduler(self, timeout=DISCORD_THREAD_JOIN_TIMEOUT):
+        """Drop scheduled tasks and stop the scheduler thread for good"""
+        self.scheduler.stop(timeout=timeout)
 
-    def _connect_sync_with_timeout(self):
+    def shutdown(self, timeout=None):
         """
-        Try synchronous connection with timeout for startup
-        Uses a single worker thread to avoid duplicate live connections
-        """
-        sync_thread = threading.Thread(target=self._connect_thread, daemon=True)
-        with self._lock:
-            self.connection_thread = sync_thread
+        Stop all Discord RPC work on game exit under one deadline
 
-        sync_thread.start()
+        New work is refused, then everything is signalled at once: a
+        best-effort CLEAR plus CLOSE goes to the IPC loop while the writer,
+        the scheduler and its workers are told to stop. The threads are
+        joined against the time that is left, so a hung Discord delays the
+        exit by at most `timeout` seconds; anything still busy is a daemon
+        thread and is left behind.
 
-        # Wait with timeout
-        sync_thread.join(timeout=self.startup_timeout)
+        Args:
+            timeout (float): Overall budget in seconds
+                (default: connection.shutdown_timeout)
 
-        if sync_thread.is_alive():
-            print(f"Discord RPC startup sync timeout ({self.startup_timeout}s), continuing in background")
+        Returns:
+            float: Seconds the shutdown took (also kept in shutdown_duration)
+        """
+        started = time.perf_counter()
+        deadline = time.monotonic() + (self.shutdown_timeout if timeout is None else timeout)
 
-        return True
-        
-    def _connect_thread(self):
-        """Internal connection thread"""
-        if self._shutdown_flag or not self.enabled:
-            return
-            
-        try:
-            # Close existing connection safely without event loop conflicts
-            self._safe_close_rpc()
-                    
-            loop = self._create_rpc_loop()
-            self.rpc = Presence(self.client_id, loop=loop)
-            self.rpc.connect()
-            
-            with self._lock:
-                self.connected = True
-                self.retry_count = 0
-            
-            self._set_status(DiscordRPCStatus.CONNECTED)
-            
-            # Set initial presence
-            initial_presence = get_presence_template('main_menu_presence') if get_presence_template else None
-            if not initial_presence:
-                initial_presence = {
-                    'state': 'В главном меню',
-                    'details': config.name or 'RenPy Game',
-                    'large_image': 'game_icon',
-                    'large_text': config.name or 'RenPy Game'
-                }
-            self._update_presence_internal(initial_presence, force=True)
-            
-            # Process pending updates
-            self._process_pending_updates()
-            
-        except Exception as e:
-            with self._lock:
-                self.connected = False
-                self.retry_count += 1
-                current_retry = self.retry_count
-            
-            self._set_status(DiscordRPCStatus.ERROR, e)
-            print(f"Discord RPC connection error (attempt {current_retry}): {e}")
+        def remaining():
+            return max(0.0, deadline - time.monotonic())
 
-            if current_retry < self.max_retries and self.enabled and not self._shutdown_flag:
-                self._schedule_retry()
-            else:
-                print(f"Discord RPC connection failed after {self.max_retries} attempts")
-                
-    def disconnect(self):
-        """Disconnect from Discord RPC and clear presence"""
         self._shutdown_flag = True
-        self._cancel_retry_timer()
-        
+        self.enabled = False  # Not persisted, the preference is kept
         with self._lock:
             self.connected = False
-        
-        # Safe cleanup without event loop conflicts
-        self._safe_close_rpc()
-            
-        # Wait for connection thread to finish (with timeout)
-        with self._lock:
-            thread = self.connection_thread
-            
-        if thread and thread.is_alive():
-            thread.join(timeout=DISCORD_THREAD_JOIN_TIMEOUT)
-            if thread.is_alive():
-                print("Warning: Connection thread did not terminate cleanly")
+            self._last_sent_fingerprint = None
+            self._throttled_update = None
+            self._deferred_update = None
+        self.outbox.discard()
+
+        # Signal everything first so the waits below overlap
+        closing = None
+        if self.ipc.is_connected():
+            closing = self.ipc.submit(self.ipc.close(clear=True))
+        self._writer.request_stop()
+        self.scheduler.request_stop()
+
+        if closing is not None:
+            try:
+                closing.result(remaining())
+            except Exception:
+                closing.cancel()
+                print("Warning: Discord did not acknowledge the final clear in time")
+        self._writer.join(remaining())
+        self.scheduler.join(remaining())
+        self.ipc.stop(timeout=remaining(), close=False)
 
-        self._set_status(DiscordRPCStatus.DISCONNECTED)
-        self._shutdown_flag = False
+        self.shutdown_duration = time.perf_counter() - started
+        if get_discord_config('logging.log_connections', True):
+            print(f"Discord RPC shutdown: {self.shutdown_duration * 1000:.0f} ms")
+        return self.shutdown_duration
 
     def _prepare_presence_payload(self, kwargs):
         """Resolve configured assets and trim unsupported payload values."""
@@ -495,76 +1839,205 @@ class DiscordRPC:
 
         return payload
 
-    def _is_rate_limited(self):
-        """Return True if update should be throttled."""
-        if not self.rate_limit_enabled:
+    def _freeze_payload(self, kwargs):
+        """Prepare a payload once and wrap it with its fingerprint."""
+        payload = self._prepare_presence_payload(kwargs)
+        return DiscordRPCPreparedPresence(payload, self._payload_fingerprint(payload))
+
+    def get_prepared_presence(self, key, build):
+        """
+        Return a cached ready-to-send payload, building it on first use
+
+        The presence returned by build() is prepared and fingerprinted once,
+        then reused until discord_config (see invalidate_discord_config()) or
+        the game name changes.
+
+        Args:
+            key (tuple): Hashable cache key identifying the presence
+            build (callable): Returns the presence dict for that key
+
+        Returns:
+            DiscordRPCPreparedPresence: Prepared payload, or None if build()
+                returned nothing
+        """
+        version = discord_config_snapshot.version if discord_config_snapshot else None
+        game_name = get_game_name() if get_game_name else None
+
+        cached = self._prepared_cache.get(key)
+        if cached is not None and cached[0] == version and cached[1] == game_name:
+            return cached[2]
+
+        presence = build()
+        prepared = self._freeze_payload(presence) if presence else None
+        self._prepared_cache[key] = (version, game_name, prepared)
+        return prepared
+
+    def get_prepared_template(self, template_name):
+        """
+        Return the ready-to-send payload for a discord_config presence template
+
+        Args:
+            template_name (str): Template name (e.g., 'main_menu_presence')
+
+        Returns:
+            DiscordRPCPreparedPresence: Prepared payload, or None if the
+                template is missing or empty
+        """
+        return self.get_prepared_presence(
+            ('template', template_name),
+            lambda: get_presence_template(template_name) if get_presence_template else None
+        )
+
+    def _payload_fingerprint(self, payload):
+        """Return a content hash of a prepared payload (None values ignored)."""
+        try:
+            normalized = {key: value for key, value in payload.items() if value is not None}
+            return hash(json.dumps(normalized, sort_keys=True, default=str))
+        except Exception:
+            return None
+
+    def _is_duplicate_payload(self, fingerprint, seq=None):
+        """Return True if Discord already shows the payload with this fingerprint."""
+        if fingerprint is None:
             return False
 
-        now = time.time()
         with self._lock:
-            elapsed = now - self._last_presence_update_time
+            if fingerprint != self._last_sent_fingerprint:
+                return False
+            self.metrics.increment('updates_deduplicated')
+            self._drop_older_throttled_update(seq)
+            return True
 
-        return elapsed < self.rate_limit_interval
+    def _acquire_send_slot(self, priority=DiscordRPCPriority.NORMAL):
+        """Take a rate limit token for an update; False if it has to wait."""
+        if not self.rate_limit_enabled:
+            return True
+        return self.rate_limiter.try_acquire(priority)
 
-    def _record_presence_update(self):
-        """Record successful update time."""
+    def _record_presence_update(self, fingerprint=None, seq=None):
+        """Record a successful update."""
         with self._lock:
-            self._last_presence_update_time = time.time()
-    
-    def _safe_close_rpc(self):
+            self._last_sent_fingerprint = fingerprint
+            self.metrics.increment('updates_sent')
+            self._drop_older_throttled_update(seq)
+
+    def _drop_older_throttled_update(self, seq):
+        """
+        Drop the held update if the update with this sequence number replaced it
+
+        Only an update submitted after the held one makes it obsolete; a held
+        update that arrived while an older send was in flight is kept.
+        Call with self._lock held.
+        """
+        held = self._throttled_update
+        if held is not None and seq is not None and held[2] < seq:
+            self._throttled_update = None
+            self.metrics.increment('updates_coalesced')
+
+    def _note_coalesced_update(self):
+        """Count an update that was superseded before it was sent."""
+        self.metrics.increment('updates_coalesced')
+
+    def _coalesce_update(self, kwargs, priority=DiscordRPCPriority.NORMAL, seq=None):
         """
-        Safely close RPC connection without event loop conflicts
-        Handles asyncio event loop issues when closing from different threads
+        Hold the newest throttled update until the rate limiter has a token for it
+
+        The held update keeps the highest priority of the updates it replaced.
+        An update older than the one already held (a trailing send that lost
+        its token) does not replace it.
         """
-        if not self.rpc:
+        self.metrics.increment('updates_throttled')
+        if seq is None:
+            seq = next(self._update_seq)
+        with self._lock:
+            held = self._throttled_update
+            if held is not None:
+                self.metrics.increment('updates_coalesced')
+                priority = max(priority, held[1])
+                if held[2] > seq:
+                    kwargs, seq = held[0], held[2]
+            self._throttled_update = (detach_discord_presence(kwargs), priority, seq)
+        self._schedule_trailing_send()
+
+    def _shed_update(self):
+        """Drop a low-priority update instead of holding or queueing it."""
+        self.metrics.increment('updates_shed')
+        return False
+
+    def _schedule_trailing_send(self):
+        """Schedule the trailing-edge send for when the held update gets a token."""
+        with self._lock:
+            if self._throttled_update is None:
+                return
+            priority = self._throttled_update[1]
+        delay = self.rate_limiter.wait_time(priority)
+        # Without the writer thread the send itself blocks on IPC, on a worker
+        # that races the game thread; sequence numbers keep the newest update held
+        self.scheduler.schedule(
+            'trailing', delay, self._send_throttled_update,
+            blocking=not self.writer_thread_enabled, replace='earlier'
+        )
+
+    def _send_throttled_update(self):
+        """Send the held update once the rate limiter allows it."""
+        with self._lock:
+            if self._throttled_update is None:
+                return
+            if not self.enabled or self._shutdown_flag:
+                self._throttled_update = None
+                return
+            priority = self._throttled_update[1]
+
+        if self.rate_limit_enabled and self.rate_limiter.wait_time(priority) > 0:
+            # Another update took the token meanwhile, wait for the next one
+            self._schedule_trailing_send()
             return
 
-        rpc = self.rpc
-        loop = getattr(rpc, 'loop', None)
-            
-        try:
-            self._bind_rpc_loop(rpc)
+        with self._lock:
+            held = self._throttled_update
+            self._throttled_update = None
+            is_connected = self.connected
 
-            # Try to clear presence first (may fail if event loop issues)
-            try:
-                rpc.clear()
-            except:
-                pass  # Ignore clear errors, focus on closing
-            
-            # Close the connection
-            try:
-                rpc.close()
-            except:
-                pass  # Ignore close errors
-                
-        finally:
-            if loop and not loop.is_closed():
-                try:
-                    loop.close()
-                except:
-                    pass
-            # Always set rpc to None to prevent reuse
-            self.rpc = None
-        
-    def _process_pending_updates(self):
-        """Process any pending updates from startup"""
-        if self.pending_updates is None or self.rpc is None:
+        if held is None or not is_connected:
+            # A reconnect restores last_update, which is at least as new
+            return
+
+        kwargs, priority, seq = held
+        # Already counted, filtered and remembered when it was held
+        if self.writer_thread_enabled:
+            self._writer.submit_update(kwargs, priority=priority)
+        else:
+            # Keeps its sequence number, so a send finishing now cannot drop a newer held update
+            self._update_presence_internal(kwargs, priority=priority, seq=seq)
+
+    def _cancel_trailing_send(self):
+        """Drop the held update and cancel its scheduled send."""
+        with self._lock:
+            self._throttled_update = None
+        self.scheduler.cancel('trailing')
+    
+    def _close_ipc(self):
+        """Clear presence (best effort) and close the IPC socket."""
+        with self._lock:
+            self._last_sent_fingerprint = None
+
+        if not self.ipc.is_connected():
             return
-            
-        while not self.pending_updates.empty():
-            try:
-                update_data = self.pending_updates.get_nowait()
-                self._update_presence_internal(update_data, force=True)
-            except Exception as e:
-                print(f"Error processing pending update: {e}")
-                break
 
+        try:
+            self.ipc.call(self.ipc.close(clear=True), timeout=DISCORD_THREAD_JOIN_TIMEOUT)
+        except DiscordIPCError as e:
+            print(f"Warning: Discord RPC close did not complete: {e}")
+        
 
-    def update_presence(self, force=False, **kwargs):
+    def update_presence(self, force=False, dedupe=True, priority=None, **kwargs):
         """
         Update Discord Rich Presence
         
         Args:
+            force (bool): Shorthand for priority='critical'
+            dedupe (bool): Skip the IPC write when Discord already shows this
+                payload. Pass False to resend anyway.
             state (str): Current state text (max 128 chars recommended)
             details (str): Details text (max 128 chars recommended)
             large_image (str): Large image key from Discord assets
@@ -576,6 +2049,10 @@ class DiscordRPC:
             party_id (str): Unique party identifier
             party_size (list): [current_size, max_size] for party display
             buttons (list): Max 2 buttons with 'label' and 'url' keys
+            priority: 'critical', 'normal' (default) or 'low', or a
+                DiscordRPCPriority value. Critical updates may use the
+                forced_reserve tokens and preempt held updates; low ones are
+                dropped under rate pressure or while reconnecting.
             
         Returns:
             bool: True if update successful or queued, False otherwise
@@ -585,95 +2062,382 @@ class DiscordRPC:
                 state="В главном меню",
                 details="Моя игра",
                 large_image="game_icon",
-                large_text="Название игры"
+                large_text="Название игры",
+                priority='critical'
             )
         """
+        return self._submit_presence(
+            kwargs, priority=DiscordRPCPriority.resolve(priority, force), dedupe=dedupe
+        )
+
+    def batch(self):
+        """
+        Collect presence changes and send them as one update
+
+        Every update_presence() / clear_presence() call made on this thread
+        inside the block (including the discord_set_* helpers) is merged;
+        on exit one payload is submitted. Nothing is sent if the block
+        raises.
+
+        Returns:
+            DiscordRPCBatch: Context manager
+
+        Example:
+            with discord_rpc.batch():
+                discord_set_in_game("Глава 1", "Эйлин")
+                discord_set_custom("Исследует мир", small_image="compass")
+        """
+        return DiscordRPCBatch(self)
+
+    def update_presence_template(self, template_name, force=False, dedupe=True, priority=None):
+        """
+        Update Discord Rich Presence from a discord_config template
+
+        Uses the prepared template cache, so this is a lookup plus a send.
+
+        Args:
+            template_name (str): Template name (e.g., 'paused_presence')
+            force (bool): Shorthand for priority='critical'
+            dedupe (bool): Skip the IPC write when Discord already shows this payload
+            priority: 'critical', 'normal' (default) or 'low' (see update_presence())
+
+        Returns:
+            bool: True if update successful or queued, False otherwise
+        """
+        return self.update_prepared_presence(
+            self.get_prepared_template(template_name), force=force, dedupe=dedupe, priority=priority
+        )
+
+    def update_prepared_presence(self, payload, force=False, dedupe=True, priority=None):
+        """
+        Update Discord Rich Presence from a payload returned by
+        get_prepared_presence() or get_prepared_template()
+
+        Args:
+            payload (DiscordRPCPreparedPresence): Prepared payload
+            force (bool): Shorthand for priority='critical'
+            dedupe (bool): Skip the IPC write when Discord already shows this payload
+            priority: 'critical', 'normal' (default) or 'low' (see update_presence())
+
+        Returns:
+            bool: True if update successful or queued, False otherwise
+        """
+        if not self.enabled or not payload:
+            return False
+        return self._submit_presence(
+            payload, priority=DiscordRPCPriority.resolve(priority, force), dedupe=dedupe
+        )
+
+    def _submit_presence(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True):
+        """Apply the skip/auto-forward policy, then route the update."""
         if not self.enabled:
             return False
 
-        # Store the update for potential retry
+        batch = self._batches.get(threading.get_ident())
+        if batch is not None:
+            return batch.add_update(kwargs, priority=priority, dedupe=dedupe)
+
+        self.metrics.increment('updates_requested')
+        self._notify_presence_request(kwargs)
+
+        if self.defer_while_skipping and self._is_skipping():
+            # Only the state where skipping stops is worth showing
+            with self._lock:
+                if self._deferred_update is not None:
+                    self.metrics.increment('updates_coalesced')
+                self._deferred_update = (detach_discord_presence(kwargs), priority, dedupe)
+            self.metrics.increment('updates_deferred')
+            return True
+
+        if self._is_rolling_back():
+            # Rollback re-executes statements; only record where it ends up
+            self._remember_presence(kwargs)
+            self._restore_pending = True
+            self.metrics.increment('updates_deferred')
+            return True
+
+        if priority >= DiscordRPCPriority.CRITICAL and self.throttle_auto_forward and self._is_auto_forwarding():
+            # Auto-forward advances on its own; let the rate limiter coalesce
+            priority = DiscordRPCPriority.NORMAL
+
+        return self._route_presence(kwargs, priority=priority, dedupe=dedupe)
+
+    def _is_rolling_back(self):
+        """Return True while Ren'Py replays statements after a rollback."""
+        try:
+            return bool(renpy.in_rollback())
+        except Exception:
+            return False
+
+    def _remember_presence(self, kwargs, cleared=False):
+        """
+        Record the presence the game asked for
+
+        Kept in last_update for reconnects and, on the game thread, in the
+        discord_rpc_presence_state store variable, which Ren'Py saves and
+        rolls back together with the game.
+        """
+        with self._lock:
+            self.last_update = detach_discord_presence(kwargs)
+            self._presence_cleared = cleared
+
+        if threading.current_thread() is threading.main_thread():
+            # {} stands for a cleared presence
+            set_discord_presence_state(dict(kwargs))
+
+    def restore_presence_state(self):
+        """
+        Show the presence recorded at the current save/rollback position
+
+        Runs after a load (config.after_load_callbacks) and at the first
+        interaction after a rollback, replacing the updates that were
+        replayed on the way with a single one.
+
+        Returns:
+            bool: True if an update or clear was submitted
+        """
+        self._restore_pending = False
+        with self._lock:
+            self._deferred_update = None
+
+        state = get_discord_presence_state()
+        if state is None or not self.enabled:
+            # Nothing recorded at this point (e.g. a save from an older version)
+            return False
+        if not state:
+            return self.clear_presence()
+
+        return self._route_presence(state, priority=DiscordRPCPriority.CRITICAL)
+
+    def presence_state_diverged(self):
+        """
+        Return True if the presence recorded at the current save/rollback
+        position differs from the one last requested
+
+        A rollback restores discord_rpc_presence_state without running the
+        presence calls in between again, so this is how the interaction
+        after it notices that Discord shows a later state.
+        """
+        state = get_discord_presence_state()
+        if state is None:
+            return False
+        with self._lock:
+            last_update = self.last_update
+            cleared = self._presence_cleared
+        if not state:
+            return not cleared
+        return cleared or dict(state) != dict(last_update)
+
+    def _is_skipping(self):
+        """Return True while Ren'Py is skipping (Ctrl or "skip unseen")."""
+        try:
+            return bool(renpy.is_skipping())
+        except Exception:
+            return bool(getattr(config, 'skipping', None))
+
+    def _is_auto_forwarding(self):
+        """Return True while auto-forward mode is on."""
+        preferences = getattr(renpy.store, '_preferences', None)
+        return bool(preferences and getattr(preferences, 'afm_enable', False))
+
+    def release_deferred_update(self):
+        """
+        Send the update held back while skipping, once skipping has stopped
+
+        Registered in config.periodic_callbacks, so the final state appears
+        shortly after the player stops skipping.
+
+        Returns:
+            bool: True if a held update was submitted
+        """
+        if self._deferred_update is None or self._is_skipping():
+            return False
+
+        with self._lock:
+            deferred = self._deferred_update
+            self._deferred_update = None
+        if deferred is None or not self.enabled:
+            return False
+
+        kwargs, priority, dedupe = deferred
+        if priority >= DiscordRPCPriority.CRITICAL and self.throttle_auto_forward and self._is_auto_forwarding():
+            priority = DiscordRPCPriority.NORMAL
+        return self._route_presence(kwargs, priority=priority, dedupe=dedupe)
+
+    def _route_presence(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True):
+        """Route a presence update to the outbox, the writer or the current thread."""
+        # Checked and queued under the lock _connect_attempt() sets `connected`
+        # with: an update queued before that is picked up by _restore_presence(),
+        # one routed after it sees the connection
         with self._lock:
-            self.last_update = kwargs.copy()
             is_connected = self.connected
-            current_status = self.status
-
-        if not is_connected:
-            # If not connected yet, queue latest update for connect/reconnect.
-            if current_status in [DiscordRPCStatus.CONNECTING, DiscordRPCStatus.RECONNECTING, DiscordRPCStatus.ERROR, DiscordRPCStatus.TIMEOUT]:
-                try:
-                    while self.pending_updates.full():
-                        try:
-                            self.pending_updates.get_nowait()
-                        except Exception:
-                            break
-                    self.pending_updates.put_nowait(kwargs.copy())
+            if not is_connected:
+                if priority <= DiscordRPCPriority.LOW:
+                    # Cosmetic change; not worth a place in the reconnect queue
+                    return self._shed_update()
+
+                # Remember the requested state so a reconnect can restore it
+                self._remember_presence(kwargs)
+
+                # Keep the latest update in the outbox for connect/reconnect
+                if self.status in [DiscordRPCStatus.CONNECTING, DiscordRPCStatus.RECONNECTING, DiscordRPCStatus.ERROR, DiscordRPCStatus.TIMEOUT]:
+                    self.outbox.put_update(kwargs, priority=priority, dedupe=dedupe)
+                    self.metrics.increment('updates_queued')
                     return True
-                except Exception as e:
-                    print(f"Warning: Failed to queue update: {e}")
-            return False
+                return False
+
+        self._remember_presence(kwargs)
+
+        if self.writer_thread_enabled:
+            # Hand off to the writer thread through the outbox; latest update wins
+            self._writer.submit_update(kwargs, priority=priority, dedupe=dedupe)
+            return True
 
-        return self._update_presence_internal(kwargs, force=force)
+        return self._update_presence_internal(kwargs, priority=priority, dedupe=dedupe)
         
-    def _update_presence_internal(self, kwargs, force=False):
+    def _update_presence_internal(self, kwargs, priority=DiscordRPCPriority.NORMAL, dedupe=True, seq=None):
         """
         Internal presence update method
         
         Args:
             kwargs (dict): Presence data to send to Discord
+            priority (int): DiscordRPCPriority in the rate limiter
+            dedupe (bool): Skip the write if the payload matches the last acknowledged one
+            seq (int): Submission order, kept by a held update when it is
+                finally sent (default: a new number)
             
         Returns:
             bool: True if update successful, False otherwise
         """
         if kwargs is None:
             return False
+        if seq is None:
+            seq = next(self._update_seq)
+
+        if isinstance(kwargs, DiscordRPCPreparedPresence):
+            payload, fingerprint = kwargs, kwargs.fingerprint
+        else:
+            payload = self._prepare_presence_payload(kwargs)
+            fingerprint = self._payload_fingerprint(payload)
+        if dedupe and self._is_duplicate_payload(fingerprint, seq):
+            return True
 
-        if not force and self._is_rate_limited():
+        if not self._acquire_send_slot(priority):
+            if priority <= DiscordRPCPriority.LOW:
+                # Under rate pressure cosmetic updates go first
+                return self._shed_update()
+            # Keep the newest state; it is sent when a token frees up
+            self._coalesce_update(kwargs, priority, seq)
             return True
             
         try:
             with self._lock:
-                rpc = self.rpc
                 is_connected = self.connected
                 
-            if rpc and is_connected:
-                payload = self._prepare_presence_payload(kwargs)
-                self._bind_rpc_loop(rpc)
-                rpc.update(**payload)
-                self._record_presence_update()
+            if is_connected and self.ipc.is_connected():
+                started = time.perf_counter()
+                self.ipc.call(self.ipc.set_activity(payload), timeout=self.update_timeout)
+                self.metrics.observe('ipc_round_trip', time.perf_counter() - started)
+                self._record_presence_update(fingerprint, seq)
                 return True
             return False
         except Exception as e:
-            print(f"Discord RPC update failed: {e}")
-            print(f"  Status: {self.status}, Connected: {self.connected}")
-            
+            return self._handle_update_error(e)
+
+    def _handle_update_error(self, error):
+        """
+        Recover from a failed SET_ACTIVITY according to the error class
+
+          - payload rejected (or not JSON encodable): drop the update and
+            keep the connection, resending it would fail the same way
+          - rate limited: Discord closed the socket; the reconnect is
+            scheduled like for a lost transport and the bucket is drained
+            so the restored presence waits for a fresh token
+          - auth invalid / transport lost / anything unexpected: see
+            _on_connection_error(); the last requested presence is
+            restored after the reconnect
+
+        Args:
+            error (Exception): What the IPC call raised
+
+        Returns:
+            bool: Always False, the update was not delivered
+        """
+        self.metrics.increment('updates_failed')
+
+        if isinstance(error, (DiscordIPCPayloadError, TypeError, ValueError)):
+            self.metrics.increment('updates_rejected')
             with self._lock:
-                self.connected = False
-                
-            self._set_status(DiscordRPCStatus.ERROR, e)
+                self.last_error = str(error)
+            print(f"Discord RPC update rejected, dropping it: {error}")
+            return False
 
-            # Try to reconnect
-            if self.enabled and not self._shutdown_flag:
-                self.connect()
-                
+        if isinstance(error, DiscordIPCRateLimitError):
+            self.metrics.increment('updates_rate_limited')
+
+        print(f"Discord RPC update failed: {error}")
+        self._on_connection_error(error)
         return False
         
     def clear_presence(self):
-        """Clear Discord Rich Presence"""
+        """
+        Clear Discord Rich Presence
+
+        The clear is ordered with updates: it replaces anything still queued
+        and is sent before later updates. While connecting it is kept so the
+        new connection does not restore the old presence.
+
+        Returns:
+            bool: True if cleared or queued, False otherwise
+        """
+        batch = self._batches.get(threading.get_ident())
+        if batch is not None:
+            return batch.add_clear()
+
+        self._notify_presence_request({})
+        self._cancel_trailing_send()
+
+        with self._lock:
+            self._deferred_update = None
+        self._remember_presence({}, cleared=True)
+        if self._is_rolling_back():
+            self._restore_pending = True
+            return True
+
+        with self._lock:
+            # Same ordering with _connect_attempt() as in _route_presence()
+            is_connected = self.connected
+            if not is_connected:
+                if self.status in [DiscordRPCStatus.CONNECTING, DiscordRPCStatus.RECONNECTING, DiscordRPCStatus.ERROR, DiscordRPCStatus.TIMEOUT]:
+                    self.outbox.put_clear()
+                    return True
+                return False
+
+        if self.writer_thread_enabled:
+            self._writer.submit_clear()
+            return True
+
+        return self._clear_presence_internal()
+
+    def _clear_presence_internal(self):
+        """Clear presence on the current thread"""
         try:
             with self._lock:
-                rpc = self.rpc
                 is_connected = self.connected
                 
-            if rpc and is_connected:
-                try:
-                    self._bind_rpc_loop(rpc)
-                    rpc.clear()
-                    return True
-                except:
-                    # Ignore event loop errors on clear
-                    return False
+            if is_connected and self.ipc.is_connected():
+                if self.rate_limit_enabled:
+                    # Never held back, but it counts against Discord's budget
+                    self.rate_limiter.try_acquire(DiscordRPCPriority.CRITICAL)
+                self.ipc.call(self.ipc.clear_activity(), timeout=self.update_timeout)
+                with self._lock:
+                    self._last_sent_fingerprint = None
+                return True
         except Exception as e:
             print(f"Discord RPC clear failed: {e}")
+            if isinstance(e, (DiscordIPCTransportError, DiscordIPCAuthError)):
+                # A new connection starts without an activity, so nothing is retried
+                self._on_connection_error(e)
             
         return False
 
@@ -687,13 +2451,15 @@ init python:
 
 def init_discord_rpc():
     """Initialize Discord RPC if enabled"""
+    started = time.perf_counter()
     try:
         # Load configuration after init phase
         discord_rpc._load_config()
         
         if discord_rpc.is_enabled():
-            # Use sync startup for better user experience
-            discord_rpc.enable(sync_startup=True)
+            # Connect in the background while the game keeps loading;
+            # wait_for_startup() bounds any wait to the first presence
+            discord_rpc.enable(sync_startup=False)
 
         # Initialize reliable wrapper if available
         if 'init_reliable_discord_rpc' in globals():
@@ -701,6 +2467,10 @@ def init_discord_rpc():
     except Exception as e:
         print(f"Discord RPC initialization error: {e}")
 
+    discord_rpc.startup_cost = time.perf_counter() - started
+    if get_discord_config('logging.log_connections', True):
+        print(f"Discord RPC startup: {discord_rpc.startup_cost * 1000:.1f} ms, connecting in background")
+
 # Auto-initialize
 init_discord_rpc()
 
@@ -712,7 +2482,7 @@ def discord_rpc_on_label_start(label_name):
     """Called when a label starts"""
     if discord_rpc.enabled:
         discord_rpc.update_presence(
-            state=f"В сцене: {label_name}",
+            state=format_label_name(label_name),
             details=config.name or 'RenPy Game'
         )
 
@@ -725,12 +2495,40 @@ def discord_rpc_on_menu():
         )
 
 """renpy
+default discord_rpc_presence_state = None
+
 init python:
 """
 
+def set_discord_presence_state(state):
+    """Store the effective presence where saves and rollback pick it up"""
+    global discord_rpc_presence_state
+    discord_rpc_presence_state = state
+
+def get_discord_presence_state():
+    """Presence recorded at the current save/rollback position, or None"""
+    return globals().get('discord_rpc_presence_state')
+
+def discord_rpc_after_load():
+    """Show the presence saved with the game instead of replaying updates"""
+    discord_rpc.restore_presence_state()
+
+def discord_rpc_on_interact():
+    """Show where a rollback ended up"""
+    if discord_rpc._restore_pending or (
+        discord_rpc._is_rolling_back() and discord_rpc.presence_state_diverged()
+    ):
+        discord_rpc.restore_presence_state()
+
+config.after_load_callbacks.append(discord_rpc_after_load)
+config.interact_callbacks.append(discord_rpc_on_interact)
+
 def discord_rpc_cleanup():
     """Cleanup Discord RPC on game exit"""
     if discord_rpc:
-        discord_rpc.disconnect()
+        discord_rpc.shutdown()
 
 config.quit_callbacks.append(discord_rpc_cleanup)
+
+# Emit the state where skipping stopped
+config.periodic_callbacks.append(discord_rpc.release_deferred_update)
@@ -5,22 +5,43 @@
 from typing import Any, Dict, Callable
 
 renpy: Any = None
-discord_set_custom: Callable = None
-discord_set_dialogue: Callable = None
-discord_set_in_game: Callable = None
-discord_set_menu: Callable = None
-discord_set_paused: Callable = None
-discord_set_loading: Callable = None
-discord_set_main_menu: Callable = None
+execute_discord_statement: Callable = None
+lint_discord_statement: Callable = None
 
 """renpy
 python early:
 """
 
-def parse_discord(lexer):
-    """Parse discord statement arguments"""
-    subcommand = lexer.word()
+DISCORD_SUBCOMMANDS = ["custom", "dialogue", "in_game", "paused", "loading", "main_menu", "menu", "template", "batch"]
+DISCORD_PRIORITY_NAMES = ["low", "normal", "critical"]
+
+def _discord_statement_key(subcommand, args):
+    """Hashable cache key for a statement: same literals, same payload"""
+    if subcommand == "batch":
+        return ("discord", subcommand) + tuple(statement["key"] for statement in args["statements"])
+
+    return ("discord", subcommand) + tuple(
+        (name, tuple(value.items()) if isinstance(value, dict) else value)
+        for name, value in sorted(args.items())
+    )
+
+
+def _parse_discord_priority(lexer):
+    """Parse an optional `priority <name>` clause; returns the name or None"""
+    clause = lexer.match(r"priority\s+\w+")
+    if clause is None:
+        return None
+
+    name = clause.split()[-1]
+    if name not in DISCORD_PRIORITY_NAMES:
+        renpy.error("Unknown discord priority: " + name + " (expected " + ", ".join(DISCORD_PRIORITY_NAMES) + ")")
+    return name
+
+
+def _parse_discord_statement(lexer, subcommand):
+    """Parse the arguments of one subcommand and its optional priority clause"""
     args = {}
+    priority = None
     
     if subcommand == "custom":
         args["state"] = lexer.string()
@@ -33,44 +54,89 @@ def parse_discord(lexer):
         args["character"] = lexer.string()
     elif subcommand == "menu":
         args["menu_name"] = lexer.string()
+    elif subcommand == "template":
+        # discord template <name> key="value" ...
+        args["name"] = lexer.require(lexer.word)
+        args["overrides"] = {}
+        while not lexer.eol():
+            priority = _parse_discord_priority(lexer)
+            if priority is not None:
+                break
+            field = lexer.require(lexer.word)
+            lexer.require("=")
+            args["overrides"][field] = lexer.require(lexer.string)
     elif subcommand in ["paused", "loading", "main_menu"]:
         pass  # No args
     else:
         renpy.error("Unknown discord subcommand: " + str(subcommand))
-        
-    return {"subcommand": subcommand, "args": args}
+
+    if priority is None:
+        priority = _parse_discord_priority(lexer)
+
+    # The priority does not change the payload, so it stays out of args and the key
+    return {"subcommand": subcommand, "args": args, "key": _discord_statement_key(subcommand, args), "priority": priority}
+
+
+def parse_discord(lexer):
+    """
+    Parse discord statement arguments
+
+    Arguments are literal strings, so the result also carries the cache key
+    the prepared payload is stored under (see execute_discord_statement()).
+
+    `discord batch:` takes a block of subcommands (one per line, without the
+    `discord` prefix) that are merged into a single update.
+
+    Any statement (and any line of a batch) may end with `priority low`,
+    `priority normal` or `priority critical`; `discord batch priority <name>:`
+    sets the priority of the whole batch.
+    """
+    subcommand = lexer.word()
+
+    if subcommand != "batch":
+        parsed = _parse_discord_statement(lexer, subcommand)
+        lexer.expect_noblock("discord " + str(subcommand))
+        return parsed
+
+    priority = _parse_discord_priority(lexer)
+    lexer.require(":")
+    lexer.expect_eol()
+    lexer.expect_block("discord batch")
+
+    statements = []
+    block = lexer.subblock_lexer()
+    while block.advance():
+        inner = block.require(block.word)
+        if inner == "batch":
+            renpy.error("discord batch blocks cannot be nested")
+        statements.append(_parse_discord_statement(block, inner))
+        block.expect_eol()
+
+    args = {"statements": statements}
+    return {"subcommand": subcommand, "args": args, "key": _discord_statement_key(subcommand, args), "priority": priority}
 
 
 def execute_discord(p):
     """Execute discord statement"""
-    subcommand = p["subcommand"]
-    args = p["args"]
-    
-    if subcommand == "custom":
-        discord_set_custom(args["state"], args["details"])
-    elif subcommand == "dialogue":
-        discord_set_dialogue(args["character"], args["scene"])
-    elif subcommand == "in_game":
-        discord_set_in_game(args["chapter"], args["character"])
-    elif subcommand == "menu":
-        discord_set_menu(args["menu_name"])
-    elif subcommand == "paused":
-        discord_set_paused()
-    elif subcommand == "loading":
-        discord_set_loading()
-    elif subcommand == "main_menu":
-        discord_set_main_menu()
+    # Statements compiled before the key existed build it here
+    key = p.get("key") or _discord_statement_key(p["subcommand"], p["args"])
+    execute_discord_statement(p["subcommand"], p["args"], key, p.get("priority"))
 
 
 def lint_discord(p):
     """Lint discord statement for errors"""
     subcommand = p["subcommand"]
-    if subcommand not in ["custom", "dialogue", "in_game", "paused", "loading", "main_menu", "menu"]:
+    if subcommand not in DISCORD_SUBCOMMANDS:
         renpy.error("Unknown discord subcommand: " + str(subcommand))
+        return
+
+    for problem in lint_discord_statement(subcommand, p["args"]):
+        renpy.error(problem)
 
 
 renpy.register_statement(
     name="discord",
+    block="possible",
     parse=parse_discord,
     execute=execute_discord,
     lint=lint_discord,
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# Presence Hot-Path Benchmark
+# Measures what a presence update costs the calling (game) thread, through the
+# real call chain against the fake Discord IPC server:
+#   discord_set_custom -> DiscordRPCAPI.set_custom -> DiscordRPC.update_presence
+#   -> _prepare_presence_payload -> IPC write
+#
+# Usage:
+#   python tools/bench_presence.py --json results.json
+#   python tools/bench_presence.py --compare results.json   # exit 1 on regression
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord_ipc import FakeDiscordIPCServer
+from renpy_harness import RenPyHarness, REPO_ROOT
+
+FAST_CONNECTION = {
+    'retry_delay': 0.2,
+    'connection_timeout': 2.0,
+    'startup_timeout': 2.0,
+    'update_timeout': 2.0,
+}
+
+# Allowed slowdown before --compare reports a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+# =============================================================================
+# STATES
+# =============================================================================
+
+def _wait(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise RuntimeError("benchmark setup timed out")
+        time.sleep(0.01)
+
+
+def setup_connected(harness, server):
+    """Connected, no client-side rate limit, no writer thread: every call is a real IPC write"""
+    rpc = harness['discord_rpc']
+    _wait(lambda: rpc.connected and server.activities)
+    return harness['discord_set_custom']
+
+
+def setup_enqueue(harness, server):
+    """Connected with the writer thread: calls only hand the update to the outbox"""
+    rpc = harness['discord_rpc']
+    _wait(lambda: rpc.connected and server.activities)
+    return harness['discord_set_custom']
+
+
+def setup_throttled(harness, server):
+    """Connected with a one-token rate limit the initial presence has spent: calls are coalesced"""
+    rpc = harness['discord_rpc']
+    _wait(lambda: rpc.connected and server.activities)
+    return harness['discord_set_custom']
+
+
+def setup_disconnected(harness, server):
+    """Discord not running: updates go to the pending queue"""
+    rpc = harness['discord_rpc']
+    _wait(lambda: rpc.connected)
+    server.stop()
+    rpc.disconnect()
+    rpc.max_retries = 0
+    rpc.connect(sync_startup=True)
+    _wait(lambda: not rpc.connected and rpc.status != harness['DiscordRPCStatus'].CONNECTING)
+    return harness['discord_set_custom']
+
+
+def setup_reconnecting(harness, server):
+    """Handshake in flight: updates queue while the writer is busy connecting"""
+    rpc = harness['discord_rpc']
+    _wait(lambda: rpc.connected)
+    rpc.disconnect()
+    server.handshake_latency = 3600.0
+    rpc.connect(sync_startup=False)
+    _wait(lambda: len(server.handshakes) < server.connections)
+    return harness['discord_set_custom']
+
+
+# state -> (discord_config overrides, setup); connection overrides win over --inline
+STATES = {
+    'connected': ({'rate_limiting': {'enabled': False},
+                   'connection': {'writer_thread_enabled': False}}, setup_connected),
+    'enqueue': ({'rate_limiting': {'enabled': False},
+                 'connection': {'writer_thread_enabled': True}}, setup_enqueue),
+    'throttled': ({'rate_limiting': {'enabled': True, 'burst': 1, 'window': 3600.0,
+                                     'forced_reserve': 0, 'low_priority_reserve': 0}}, setup_throttled),
+    'disconnected': ({'rate_limiting': {'enabled': False}}, setup_disconnected),
+    'reconnecting': ({'rate_limiting': {'enabled': False}}, setup_reconnecting),
+}
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+def measure(call, iterations, warmup, distinct):
+    """
+    Time each call on this thread
+
+    Returns:
+        dict: calls_per_sec and latency percentiles in microseconds
+    """
+    for i in range(warmup):
+        call("Warmup {}".format(i), "Benchmark")
+
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for i in range(iterations):
+        state = "Step {}".format(i) if distinct else "Step"
+        before = clock()
+        call(state, "Benchmark")
+        samples.append(clock() - before)
+    elapsed = (clock() - started) / 1e9
+
+    samples.sort()
+    return {
+        'calls_per_sec': iterations / elapsed if elapsed else 0.0,
+        'p50_us': percentile(samples, 0.50) / 1000.0,
+        'p99_us': percentile(samples, 0.99) / 1000.0,
+        'max_us': samples[-1] / 1000.0,
+    }
+
+
+def run_state(name, iterations, warmup, distinct, writer_thread):
+    """Run one state against a fresh server and module instance"""
+    overrides, setup = STATES[name]
+    sections = {'connection': dict(FAST_CONNECTION, writer_thread_enabled=writer_thread)}
+    for section, values in overrides.items():
+        sections.setdefault(section, {}).update(values)
+
+    server = FakeDiscordIPCServer().start()
+    harness = RenPyHarness(overrides=sections).load()
+    try:
+        call = setup(harness, server)
+        result = measure(call, iterations, warmup, distinct)
+
+        rpc = harness['discord_rpc']
+        rpc.flush_presence(2.0)
+        info = rpc.get_status_info()
+        result.update({
+            'updates_sent': info.get('updates_sent', 0),
+            'updates_coalesced': info.get('updates_coalesced', 0),
+            'updates_deduplicated': info.get('updates_deduplicated', 0),
+        })
+        return result
+    finally:
+        harness.quit()
+        server.stop()
+
+
+def run(states, iterations, warmup, repeat, distinct, writer_thread):
+    """
+    Run every state `repeat` times and keep the median of each metric
+
+    Returns:
+        dict: JSON-serialisable results with run metadata
+    """
+    os.environ['XDG_RUNTIME_DIR'] = tempfile.mkdtemp(prefix='discord-rpc-bench-')
+    results = {}
+
+    for name in states:
+        runs = [run_state(name, iterations, warmup, distinct, writer_thread) for _ in range(repeat)]
+        results[name] = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'repeat': repeat,
+            'distinct_payloads': distinct,
+            'writer_thread': writer_thread,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'states': results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def print_report(report, baseline=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Print a results table, with deltas against a baseline if given
+
+    Returns:
+        list: Names of states that regressed beyond threshold
+    """
+    meta = report['meta']
+    print("=== Presence hot path ({} calls, commit {}, Python {}) ===".format(
+        meta['iterations'], meta['commit'] or '?', meta['python']))
+    if baseline:
+        print("    baseline: commit {}".format(baseline['meta'].get('commit') or '?'))
+
+    header = "{:<14}{:>12}{:>11}{:>11}{:>11}{:>8}{:>10}".format(
+        "state", "calls/sec", "p50 us", "p99 us", "max us", "sent", "coalesced")
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+    for name, result in report['states'].items():
+        print("{:<14}{:>12.0f}{:>11.1f}{:>11.1f}{:>11.1f}{:>8}{:>10}".format(
+            name, result['calls_per_sec'], result['p50_us'], result['p99_us'], result['max_us'],
+            int(result['updates_sent']), int(result['updates_coalesced'])))
+
+        base = (baseline or {}).get('states', {}).get(name)
+        if not base:
+            continue
+
+        p99_change = _change(result['p99_us'], base['p99_us'])
+        rate_change = _change(result['calls_per_sec'], base['calls_per_sec'])
+        regressed = p99_change > threshold or rate_change < -threshold / (1 + threshold)
+        print("{:<14}{:>11.0%} {:>21.0%}{}".format(
+            "  vs base", rate_change, p99_change, "   REGRESSION" if regressed else ""))
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+
+def _change(current, base):
+    return (current - base) / base if base else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the presence update hot path")
+    parser.add_argument('--states', nargs='+', choices=list(STATES), default=list(STATES))
+    parser.add_argument('--iterations', type=int, default=2000, help="Timed calls per state")
+    parser.add_argument('--warmup', type=int, default=200, help="Untimed calls before measuring")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per state (median is reported)")
+    parser.add_argument('--same-payload', action='store_true',
+                        help="Send an identical payload every call (exercises deduplication)")
+    parser.add_argument('--inline', action='store_true',
+                        help="Disable the writer thread (connection.writer_thread_enabled = False)")
+    parser.add_argument('--json', metavar='PATH', help="Write results to PATH")
+    parser.add_argument('--compare', metavar='PATH', help="Compare against an earlier --json result")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed p99 / throughput change before flagging (default 0.25)")
+    args = parser.parse_args()
+
+    report = run(args.states, args.iterations, args.warmup, args.repeat,
+                 distinct=not args.same_payload, writer_thread=not args.inline)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = print_report(report, baseline, args.threshold)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print("Results written to {}".format(args.json))
+
+    if regressions:
+        print("Regressed: {}".format(", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# Fake Discord IPC Server
+# Stand-in for the Discord client that speaks the IPC handshake and frame
+# protocol, so the RPC module can be exercised on a headless machine
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+
+OP_HANDSHAKE = 0
+OP_FRAME = 1
+OP_CLOSE = 2
+OP_PING = 3
+OP_PONG = 4
+
+HEADER = struct.Struct('<II')
+
+# RPC close / error codes used by the Discord client
+CLOSE_INVALID_CLIENT_ID = 4000
+CLOSE_RATE_LIMITED = 4002
+ERROR_INVALID_PAYLOAD = 4000
+
+
+def default_socket_path(index=0):
+    """Return the path the real client would listen on ($XDG_RUNTIME_DIR/discord-ipc-N)"""
+    base = (os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or
+            os.environ.get('TMP') or os.environ.get('TEMP') or '/tmp')
+    return os.path.join(base, 'discord-ipc-{}'.format(index))
+
+
+class FakeDiscordIPCServer:
+    """
+    Local fake Discord IPC endpoint
+
+    Behaviour knobs (all can be changed while the server runs):
+        latency (float): Seconds to wait before answering each command
+        handshake_latency (float): Seconds to wait before answering the handshake
+        reject_handshake (tuple): (code, message) to close the handshake with
+        drop_after_frames (int): Close each connection after N command frames
+        error_replies (dict): cmd -> (code, message) answered with an ERROR event
+        rate_limit (tuple): (count, period) SET_ACTIVITY calls allowed per period;
+            the call over the limit is answered with CLOSE 4002, like Discord does
+        respond (bool): When False, commands and pings are read but never answered (hung client)
+    """
+
+    def __init__(self, path=None, latency=0.0, handshake_latency=0.0, reject_handshake=None,
+                 drop_after_frames=None, error_replies=None, rate_limit=None, verbose=False):
+        self.path = path or default_socket_path()
+        self.latency = latency
+        self.handshake_latency = handshake_latency
+        self.reject_handshake = reject_handshake
+        self.drop_after_frames = drop_after_frames
+        self.error_replies = dict(error_replies or {})
+        self.rate_limit = rate_limit
+        self.respond = True
+        self.verbose = verbose
+
+        # Observations
+        self.handshakes = []
+        self.commands = []
+        self.activities = []
+        self.pings = 0
+        self.connections = 0
+        self.dropped = 0
+
+        self._loop = None
+        self._thread = None
+        self._server = None
+        self._clients = set()
+        self._activity_times = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        """Start listening on a background thread"""
+        if self._thread:
+            return self
+
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._listen())
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="FakeDiscordIPC", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        """Close every connection and stop listening"""
+        if not self._thread:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            future.result(2.0)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(2.0)
+        self._thread = None
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def drop_connections(self):
+        """Close all live client sockets without a CLOSE frame (simulates a crash)"""
+        asyncio.run_coroutine_threadsafe(self._drop_all(), self._loop).result(2.0)
+
+    def reset(self):
+        """Forget recorded observations"""
+        with self._lock:
+            self.handshakes.clear()
+            self.commands.clear()
+            self.activities.clear()
+            self._activity_times.clear()
+            self.pings = 0
+            self.connections = 0
+            self.dropped = 0
+
+    def wait_for(self, predicate, timeout=5.0):
+        """
+        Block until predicate(server) is true
+
+        Returns:
+            bool: True if the predicate became true in time
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: predicate(self), timeout)
+
+    # -------------------------------------------------------------------------
+    # Protocol
+    # -------------------------------------------------------------------------
+
+    async def _listen(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+
+    async def _shutdown(self):
+        await self._drop_all()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+        # Handlers parked in a latency sleep would otherwise outlive the loop
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _drop_all(self):
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+
+    def _record(self, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                target = getattr(self, name)
+                if isinstance(target, list):
+                    target.append(value)
+                else:
+                    setattr(self, name, target + value)
+            self._changed.notify_all()
+
+    def _log(self, message):
+        if self.verbose:
+            print("[fake-discord] " + message)
+
+    @staticmethod
+    def _send(writer, op, data):
+        body = json.dumps(data).encode('utf-8')
+        writer.write(HEADER.pack(op, len(body)) + body)
+
+    @staticmethod
+    async def _read(reader):
+        header = await reader.readexactly(HEADER.size)
+        op, length = HEADER.unpack(header)
+        body = await reader.readexactly(length) if length else b'{}'
+        return op, json.loads(body.decode('utf-8'))
+
+    async def _handle_client(self, reader, writer):
+        self._clients.add(writer)
+        self._record(connections=1)
+        frames = 0
+
+        try:
+            op, data = await self._read(reader)
+            if op != OP_HANDSHAKE:
+                return
+            if self.handshake_latency:
+                await asyncio.sleep(self.handshake_latency)
+            self._record(handshakes=data)
+            self._log("handshake {}".format(data))
+
+            if self.reject_handshake:
+                code, message = self.reject_handshake
+                self._send(writer, OP_CLOSE, {'code': code, 'message': message})
+                await writer.drain()
+                return
+
+            self._send(writer, OP_FRAME, {
+                'cmd': 'DISPATCH', 'evt': 'READY', 'nonce': None,
+                'data': {'v': 1, 'config': {'api_endpoint': '//discord.com/api'},
+                         'user': {'id': '0', 'username': 'fake'}}
+            })
+            await writer.drain()
+
+            while True:
+                op, data = await self._read(reader)
+
+                if op == OP_PING:
+                    self._record(pings=1)
+                    if not self.respond:
+                        continue
+                    self._send(writer, OP_PONG, data)
+                    await writer.drain()
+                    continue
+                if op == OP_CLOSE:
+                    self._log("client closed")
+                    return
+                if op != OP_FRAME:
+                    continue
+
+                frames += 1
+                self._record(commands=data)
+                self._log("frame {}".format(data))
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if not self.respond:
+                    continue
+
+                reply_op, reply = self._reply_for(data)
+                self._send(writer, reply_op, reply)
+                await writer.drain()
+                if reply_op == OP_CLOSE:
+                    self._log("closed: {}".format(reply))
+                    return
+
+                if self.drop_after_frames and frames >= self.drop_after_frames:
+                    self._record(dropped=1)
+                    return
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def _reply_for(self, data):
+        """Build the response to a command: (OP_FRAME, frame) or (OP_CLOSE, close data)"""
+        cmd = data.get('cmd')
+        nonce = data.get('nonce')
+        args = data.get('args') or {}
+
+        if cmd in self.error_replies:
+            code, message = self.error_replies[cmd]
+            return OP_FRAME, {'cmd': cmd, 'evt': 'ERROR', 'nonce': nonce, 'data': {'code': code, 'message': message}}
+
+        if cmd == 'SET_ACTIVITY':
+            if self._rate_limited():
+                self._record(dropped=1)
+                return OP_CLOSE, {'code': CLOSE_RATE_LIMITED, 'message': 'You are being rate limited'}
+            self._record(activities=args.get('activity'))
+
+        return OP_FRAME, {'cmd': cmd, 'evt': None, 'nonce': nonce, 'data': args.get('activity')}
+
+    def _rate_limited(self):
+        if not self.rate_limit:
+            return False
+        count, period = self.rate_limit
+        now = time.monotonic()
+        with self._lock:
+            self._activity_times = [t for t in self._activity_times if now - t < period]
+            if len(self._activity_times) >= count:
+                return True
+            self._activity_times.append(now)
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Discord IPC server for headless testing")
+    parser.add_argument('--path', default=None, help="Socket path (default: $XDG_RUNTIME_DIR/discord-ipc-0)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before each command reply")
+    parser.add_argument('--handshake-latency', type=float, default=0.0, help="Seconds before the handshake reply")
+    parser.add_argument('--drop-after', type=int, default=None, help="Drop each connection after N commands")
+    parser.add_argument('--reject-handshake', action='store_true', help="Reject handshakes as an invalid client ID")
+    parser.add_argument('--error', action='append', default=[], metavar="CMD:CODE:MESSAGE",
+                        help="Answer CMD with an ERROR event (repeatable)")
+    parser.add_argument('--rate-limit', default=None, metavar="COUNT/PERIOD",
+                        help="Allow COUNT SET_ACTIVITY calls per PERIOD seconds (e.g. 5/20)")
+    args = parser.parse_args()
+
+    errors = {}
+    for spec in args.error:
+        cmd, code, message = spec.split(':', 2)
+        errors[cmd] = (int(code), message)
+
+    rate_limit = None
+    if args.rate_limit:
+        count, period = args.rate_limit.split('/')
+        rate_limit = (int(count), float(period))
+
+    server = FakeDiscordIPCServer(
+        path=args.path,
+        latency=args.latency,
+        handshake_latency=args.handshake_latency,
+        reject_handshake=(CLOSE_INVALID_CLIENT_ID, 'Invalid Client ID') if args.reject_handshake else None,
+        drop_after_frames=args.drop_after,
+        error_replies=errors,
+        rate_limit=rate_limit,
+        verbose=True,
+    )
+    server.start()
+    print("Fake Discord IPC listening on {}".format(server.path))
+
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,947 @@
+#!/usr/bin/env python3
+# Discord RPC Integration Scenarios
+# Runs the real module files against the fake Discord IPC server:
+#   python tools/ipc_scenarios.py [scenario ...]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord_ipc import FakeDiscordIPCServer, CLOSE_INVALID_CLIENT_ID, ERROR_INVALID_PAYLOAD
+from renpy_harness import RenPyHarness, HarnessLexer
+
+# Short timings keep each scenario quick
+FAST_CONNECTION = {
+    'retry_delay': 0.2,
+    'connection_timeout': 2.0,
+    'startup_timeout': 2.0,
+    'update_timeout': 2.0,
+}
+NO_RATE_LIMIT = {'enabled': False}
+
+
+def has_state(state):
+    """Predicate: the fake server received an activity with this state"""
+    return lambda server: any(a and a.get('state') == state for a in server.activities)
+
+
+def has_command_state(state):
+    """Predicate: a SET_ACTIVITY with this state reached the server (it may not be answered yet)"""
+    def check(server):
+        for command in list(server.commands):
+            activity = (command.get('args') or {}).get('activity') or {}
+            if activity.get('state') == state:
+                return True
+        return False
+    return check
+
+
+def start(server, **overrides):
+    """Load the module against a running fake server"""
+    sections = {'connection': dict(FAST_CONNECTION), 'rate_limiting': dict(NO_RATE_LIMIT)}
+    for section, values in overrides.items():
+        sections.setdefault(section, {}).update(values)
+    return RenPyHarness(overrides=sections).load()
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+def scenario_connect_and_update(server):
+    """Handshake succeeds and presence updates reach Discord"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        expect(server.handshakes[0].get('client_id') == harness.client_id, "wrong client_id in handshake")
+
+        rpc.update_presence(state="Scenario", details="connect_and_update")
+        expect(server.wait_for(has_state("Scenario")), "update was not delivered")
+        expect(rpc.connected, "module does not report a connection")
+    finally:
+        harness.quit()
+
+
+def scenario_slow_discord(server):
+    """A slow Discord client does not block the caller"""
+    server.latency = 0.5
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities, 5.0), "initial presence was not sent")
+
+        started = time.perf_counter()
+        rpc.update_presence(state="Slow", details="slow_discord")
+        elapsed = time.perf_counter() - started
+        expect(elapsed < 0.1, "update_presence blocked for {:.3f}s".format(elapsed))
+        expect(server.wait_for(has_state("Slow"), 5.0), "update was not delivered")
+    finally:
+        harness.quit()
+
+
+def scenario_queued_while_connecting(server):
+    """Updates made during the handshake are delivered once connected"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.disconnect()
+
+        server.handshake_latency = 0.5
+        rpc.connect(sync_startup=False)
+        expect(not rpc.connected, "handshake latency was not applied")
+        rpc.update_presence(state="Queued", details="queued_while_connecting")
+        expect(server.wait_for(has_state("Queued"), 5.0), "queued update was not delivered")
+    finally:
+        harness.quit()
+
+
+def scenario_queued_as_connection_opens(server):
+    """An update queued while the connection is being marked open is not stranded in the outbox"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.disconnect()
+
+        # Widen the race: the game thread records and queues its update only
+        # after the new connection restored the presence (or after 1 s, if
+        # that has to wait for the game thread)
+        restored = threading.Event()
+        restore_presence, remember_presence = rpc._restore_presence, rpc._remember_presence
+
+        def restore_then_signal():
+            try:
+                return restore_presence()
+            finally:
+                restored.set()
+
+        def remember_after_restore(kwargs, cleared=False):
+            if kwargs.get('state') == "Racing":
+                restored.wait(1.0)
+            return remember_presence(kwargs, cleared)
+
+        rpc._restore_presence = restore_then_signal
+        rpc._remember_presence = remember_after_restore
+
+        server.handshake_latency = 0.3
+        rpc.connect(sync_startup=False)
+        rpc.update_presence(state="Racing", details="queued_as_connection_opens")
+        expect(server.wait_for(has_state("Racing"), 5.0), "update queued during the connect was stranded")
+    finally:
+        harness.quit()
+
+
+def scenario_reconnect_after_drop(server):
+    """A dropped socket is detected and the module reconnects"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+
+        server.drop_connections()
+        expect(server.wait_for(lambda s: s.connections >= 2, 5.0), "module did not reconnect")
+        expect(server.wait_for(lambda s: len(s.handshakes) >= 2, 5.0), "no handshake after reconnect")
+
+        deadline = time.monotonic() + 5.0
+        while not rpc.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        rpc.update_presence(state="Back", details="reconnect_after_drop")
+        expect(server.wait_for(has_state("Back"), 5.0), "update after reconnect was not delivered")
+    finally:
+        harness.quit()
+
+
+def scenario_reconnect_sends_final_state(server):
+    """Updates made while reconnecting collapse to one write of the final state"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        rpc.update_presence(state="Before")
+        expect(server.wait_for(has_state("Before"), 5.0), "update was not delivered")
+
+        server.handshake_latency = 0.5
+        server.drop_connections()
+        deadline = time.monotonic() + 5.0
+        while rpc.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sent_before = len(server.activities)
+
+        for i in range(20):
+            rpc.update_presence(state="Offline {}".format(i))
+        rpc.clear_presence()
+        rpc.update_presence(state="Final")
+        expect(rpc.get_metrics()['pending_updates'] <= 2, "outbox is not bounded")
+
+        expect(server.wait_for(has_state("Final"), 5.0), "final state was not delivered")
+        time.sleep(0.2)
+        sent = server.activities[sent_before:]
+        expect([a and a.get('state') for a in sent] == ["Final"],
+               "expected only the final state, got {}".format(sent))
+    finally:
+        harness.quit()
+
+
+def scenario_invalid_client_id(server):
+    """A rejected client ID leaves the module disconnected with an error and is not retried"""
+    server.reject_handshake = (CLOSE_INVALID_CLIENT_ID, "Invalid Client ID")
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.handshakes, 5.0), "no handshake attempted")
+        rpc.flush_presence(2.0)
+        rpc.update_presence(state="Rejected")
+        expect(not rpc.connected, "module reports a connection after rejection")
+        expect(not server.activities, "activity accepted without a handshake")
+        expect(rpc.status == harness['DiscordRPCStatus'].ERROR, "status is {} after rejection".format(rpc.status))
+
+        time.sleep(1.0)  # Several retry delays
+        expect(server.connections == 1, "rejected client ID was retried {} times".format(server.connections - 1))
+        expect(not rpc.scheduler.is_pending('retry'), "retry scheduled for a rejected client ID")
+    finally:
+        harness.quit()
+
+
+def scenario_invalid_command(server):
+    """ERROR 4002 (invalid command) is a rejected payload, not a rate limit"""
+    server.error_replies['SET_ACTIVITY'] = (4002, 'Invalid command')
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.connections and s.commands, 5.0), "no command reached the server")
+        rpc.flush_presence(2.0)
+        rpc.update_presence(state="Invalid")
+        rpc.flush_presence(2.0)
+        time.sleep(0.3)
+
+        counters = rpc.get_metrics()['counters']
+        expect(counters['updates_rate_limited'] == 0, "invalid command was treated as a rate limit")
+        expect(counters['updates_rejected'] >= 1, "invalid command was not counted as rejected")
+        expect(rpc.connected and server.connections == 1, "invalid command tore down the connection")
+        expect(not rpc.scheduler.is_pending('trailing'), "invalid command was held for a resend")
+    finally:
+        harness.quit()
+
+
+def scenario_broken_pipe(server):
+    """An OSError from the socket write is a lost transport, not a rejected payload"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    ipc = harness['discord_ipc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+
+        async def broken():
+            raise BrokenPipeError(32, "Broken pipe")
+        ipc._writer.drain = broken
+        rpc.update_presence(state="Into the void")
+        rpc.flush_presence(2.0)
+
+        counters = rpc.get_metrics()['counters']
+        expect(counters['updates_rejected'] == 0, "broken pipe was counted as a rejected payload")
+        expect(server.wait_for(lambda s: s.connections >= 2, 5.0), "module did not reconnect")
+        expect(server.wait_for(has_state("Into the void"), 5.0), "update was not restored after the reconnect")
+    finally:
+        harness.quit()
+
+
+def scenario_payload_rejected(server):
+    """A rejected payload is dropped and the connection is kept"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+
+        server.error_replies['SET_ACTIVITY'] = (ERROR_INVALID_PAYLOAD, "child \"activity\" fails")
+        rpc.update_presence(state="Broken")
+        expect(server.wait_for(lambda s: any(c.get('args', {}).get('activity', {}).get('state') == "Broken"
+                                             for c in s.commands)), "command was not sent")
+        rpc.flush_presence(2.0)
+        expect(rpc.connected and server.connections == 1, "rejected payload tore down the connection")
+        expect(rpc.get_metrics()['counters']['updates_rejected'] == 1, "rejection was not counted")
+
+        server.error_replies.clear()
+        rpc.update_presence(state="Fixed")
+        expect(server.wait_for(has_state("Fixed"), 10.0), "writer stopped after an ERROR reply")
+        expect(server.connections == 1, "module reconnected after a rejected payload")
+    finally:
+        harness.quit()
+
+
+def scenario_rate_limited_by_discord(server):
+    """Discord closes the socket with 4002; the module reconnects and shows the last state"""
+    server.rate_limit = (2, 1.0)
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        for i in range(5):
+            rpc.update_presence(state="Burst {}".format(i))
+            rpc.flush_presence(5.0)
+
+        counters = rpc.get_metrics()['counters']
+        expect(counters['updates_rate_limited'] >= 1, "Discord's rate limit was not recognised")
+        expect(counters['updates_rejected'] == 0, "rate limit was counted as a rejected payload")
+        expect(server.wait_for(lambda s: s.connections >= 2, 5.0), "module did not reconnect after the limit")
+        expect(server.wait_for(has_state("Burst 4"), 5.0), "last state was not restored after the limit")
+
+        time.sleep(1.1)
+        rpc.update_presence(state="After limit")
+        expect(server.wait_for(has_state("After limit"), 5.0), "update after rate limit was not delivered")
+    finally:
+        harness.quit()
+
+
+def scenario_transport_lost_off_game_thread(server):
+    """A failed write on the game thread schedules the reconnect instead of running it"""
+    harness = start(server, connection={'writer_thread_enabled': False, 'update_timeout': 0.3,
+                                        'startup_sync_enabled': True})
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        deadline = time.monotonic() + 5.0
+        while not rpc.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        connect_threads = []
+        connect_attempt = rpc._connect_attempt
+
+        def record_attempt():
+            connect_threads.append(threading.current_thread())
+            connect_attempt()
+        rpc._connect_attempt = record_attempt
+
+        server.latency = 2.0  # The write times out on this (game) thread
+        started = time.perf_counter()
+        rpc.update_presence(state="Timed out")
+        elapsed = time.perf_counter() - started
+        server.latency = 0.0
+
+        expect(elapsed < 1.0, "failed update blocked the game thread for {:.2f}s".format(elapsed))
+        expect(server.wait_for(lambda s: s.connections >= 2, 5.0), "module did not reconnect")
+        expect(server.wait_for(has_state("Timed out"), 5.0), "presence was not restored after the reconnect")
+        expect(connect_threads and threading.main_thread() not in connect_threads,
+               "reconnect ran on the game thread")
+    finally:
+        harness.quit()
+
+
+def scenario_heartbeat(server):
+    """Health checks use PING/PONG and never touch the visible activity"""
+    harness = start(server, connection={'health_check_interval': 0.5})
+    rpc = harness['discord_rpc']
+    try:
+        rpc.update_presence(state="Visible")
+        expect(server.wait_for(has_state("Visible"), 5.0), "update was not delivered")
+        activities = len(server.activities)
+
+        expect(server.wait_for(lambda s: s.pings >= 1, 15.0), "no heartbeat was sent")
+        time.sleep(0.2)
+        expect(len(server.activities) == activities, "heartbeat changed the activity")
+        expect(rpc.get_metrics()['counters']['health_checks'] >= 1, "heartbeat not counted")
+
+        # A hung client fails the probe and triggers recovery
+        server.respond = False
+        expect(server.wait_for(lambda s: s.pings >= 2, 15.0), "no second heartbeat")
+        deadline = time.monotonic() + 5.0
+        while not rpc.get_metrics()['counters']['health_check_failures'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        expect(rpc.get_metrics()['counters']['health_check_failures'] >= 1, "hung client not detected")
+    finally:
+        harness.quit()
+
+
+def scenario_auto_tracking(server):
+    """Ren'Py callbacks drive presence with at most one update per interaction"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    config = harness.config
+    store = harness.renpy.store
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+
+        def interact():
+            for callback in config.interact_callbacks:
+                callback()
+
+        def say(who):
+            store._last_say_who = who
+            for callback in config.all_character_callbacks:
+                callback('begin', interact=True)
+            interact()
+
+        requested = rpc.get_metrics()['counters']['updates_requested']
+        for callback in config.label_callbacks:
+            callback('chapter_1', False)
+        for _ in range(20):
+            say('e')
+
+        expect(server.wait_for(has_state("Диалог с Эйлин"), 5.0), "speaker was not tracked")
+        sent = rpc.get_metrics()['counters']['updates_requested'] - requested
+        expect(sent == 1, "expected one update for 20 lines, got {}".format(sent))
+    finally:
+        harness.quit()
+
+
+def scenario_manual_over_tracking(server):
+    """A discord statement is not overwritten by tracked dialogue until the next label"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    config = harness.config
+    store = harness.renpy.store
+    statement = harness.renpy.statements['discord']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+        sent_before = len(server.activities)
+
+        def interact():
+            for callback in config.interact_callbacks:
+                callback()
+
+        def say(who):
+            store._last_say_who = who
+            for callback in config.all_character_callbacks:
+                callback('begin', interact=True)
+            interact()
+
+        def label(name):
+            for callback in config.label_callbacks:
+                callback(name, False)
+
+        label('chapter_1')
+        statement['execute'](statement['parse'](HarnessLexer('custom "Boss fight" "Chapter 1"')))
+        say('e')
+        say(None)
+        expect(server.wait_for(has_state("Boss fight"), 5.0), "manual presence was not sent")
+        rpc.flush_presence(2.0)
+        sent = [a and a.get('state') for a in server.activities[sent_before:]]
+        expect(sent == ["Boss fight"], "tracker overwrote the manual presence: {}".format(sent))
+
+        # The next label hands the presence back to the tracker
+        label('chapter_2')
+        say('e')
+        expect(server.wait_for(has_state("Диалог с Эйлин"), 5.0), "tracking did not resume")
+    finally:
+        harness.quit()
+
+
+def scenario_config_caches(server):
+    """Config snapshot, label formatter and prepared payloads follow discord_config changes"""
+    harness = start(server, connection={'writer_thread_enabled': False})
+    rpc = harness['discord_rpc']
+    discord_config = harness['discord_config']
+    get_config = harness['get_discord_config']
+    invalidate = harness['invalidate_discord_config']
+    format_label = harness['format_label_name']
+    try:
+        # The snapshot is kept until invalidate_discord_config()
+        retries = get_config('connection.max_retries')
+        version = harness['discord_config_snapshot'].version
+        discord_config.connection['max_retries'] = retries + 7
+        expect(get_config('connection.max_retries') == retries, "snapshot was not kept between lookups")
+        invalidate()
+        expect(get_config('connection.max_retries') == retries + 7, "snapshot was not rebuilt")
+        expect(harness['discord_config_snapshot'].version == version + 1, "snapshot version did not change")
+        harness.persistent.discord_rpc_sync_startup = True
+        invalidate()
+        expect(get_config('connection.startup_sync_enabled') is True, "persistent override was not applied")
+
+        # discord_rpc reloads the settings it copied out of the config
+        expect(rpc.max_retries == retries + 7 and rpc.startup_sync_enabled is True,
+               "discord_rpc kept its old settings")
+        limiter = rpc.rate_limiter
+        discord_config.rate_limiting['window'] = 30.0
+        discord_config.connection['update_timeout'] = 1.5
+        invalidate()
+        expect(limiter.window == 30.0 and rpc.update_timeout == 1.5, "rate limit and timeouts were not reloaded")
+        expect(rpc.reconnect_policy.max_retries == retries + 7, "reconnect policy was not reloaded")
+        limiter.try_acquire(harness['DiscordRPCPriority'].CRITICAL)
+        available = limiter.available()
+        invalidate()
+        expect(limiter.available() == available, "reloading unchanged limits refilled the bucket")
+
+        # The label matcher is rebuilt with the snapshot
+        expect(format_label('chapter_1') == "Глава 1", "label pattern was not applied")
+        discord_config.label_patterns = {'ch_': "A {ch}", 'ch_x': "B {ch_x}"}
+        expect(format_label('chapter_1') == "Глава 1", "formatter rebuilt without invalidation")
+        invalidate()
+        expect(format_label('ch_x1') == "A X1", "first matching pattern did not win")
+        expect(format_label('route_alice') == "Route Alice", "unmatched label was not title-cased")
+        discord_config.label_patterns = {'ch_x': "B {ch_x}", 'ch_': "A {ch}"}
+        invalidate()
+        expect(format_label('ch_x1') == "B 1", "pattern order was not kept")
+
+        # The memo evicts its oldest labels
+        formatter = harness['DiscordLabelFormatter'](max_cache_size=3)
+        expect(harness['discord_label_formatter'].max_cache_size == harness['DISCORD_LABEL_CACHE_SIZE'],
+               "default cache size is not DISCORD_LABEL_CACHE_SIZE")
+        for name in ('ch_1', 'ch_2', 'ch_3', 'ch_4'):
+            formatter.format(name)
+        expect(list(formatter._cache) == ['ch_2', 'ch_3', 'ch_4'], "memo did not evict the oldest label")
+
+        # Prepared templates are keyed on the config version and the game name
+        paused = rpc.get_prepared_template('paused_presence')
+        expect(rpc.get_prepared_template('paused_presence') is paused, "template was rebuilt without a change")
+        discord_config.game_name = "Renamed Game"
+        renamed = rpc.get_prepared_template('paused_presence')
+        expect(renamed is not paused and renamed['large_text'] == "Renamed Game",
+               "template was not rebuilt after the game name changed")
+        discord_config.paused_presence = dict(discord_config.paused_presence, state="Перерыв")
+        expect(rpc.get_prepared_template('paused_presence') is renamed, "template rebuilt without invalidation")
+        invalidate()
+        expect(rpc.get_prepared_template('paused_presence')['state'] == "Перерыв",
+               "template was not rebuilt after invalidate_discord_config()")
+    finally:
+        harness.quit()
+
+
+def scenario_skipping(server):
+    """Updates made while skipping are held and only the final state is sent"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+        sent_before = len(server.activities)
+
+        harness.renpy.skipping = True
+        for i in range(100):
+            harness['discord_set_custom']("Skipped {}".format(i))
+        expect(rpc.get_metrics()['counters']['updates_deferred'] == 100, "updates were not deferred")
+        expect(not rpc.release_deferred_update(), "update released while still skipping")
+
+        harness.renpy.skipping = False
+        for callback in harness.config.periodic_callbacks:
+            callback()
+        expect(server.wait_for(has_state("Skipped 99"), 5.0), "final state was not sent")
+        sent = [a and a.get('state') for a in server.activities[sent_before:]]
+        expect(sent == ["Skipped 99"], "expected only the final state, got {}".format(sent))
+    finally:
+        harness.quit()
+
+
+def scenario_rollback_and_load(server):
+    """Rollback and load show the recorded position with one update"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        def interact():
+            for callback in harness.config.interact_callbacks:
+                callback()
+
+        harness['discord_set_custom']("Chapter 1")
+        expect(server.wait_for(has_state("Chapter 1"), 5.0), "update was not delivered")
+        chapter_1 = dict(harness['discord_rpc_presence_state'])
+        expect(chapter_1['state'] == "Chapter 1", "state was not recorded")
+        harness['discord_set_custom']("Chapter 2")
+        expect(server.wait_for(has_state("Chapter 2"), 5.0), "update was not delivered")
+        rpc.flush_presence(2.0)
+        sent_before = len(server.activities)
+
+        # Rolling back restores the store; the calls in between do not run again
+        harness.renpy.rolling_back = True
+        harness.store['discord_rpc_presence_state'] = chapter_1
+        interact()
+        interact()
+        harness.renpy.rolling_back = False
+        interact()
+
+        rpc.flush_presence(2.0)
+        sent = [a and a.get('state') for a in server.activities[sent_before:]]
+        expect(sent == ["Chapter 1"], "expected one update after rollback, got {}".format(sent))
+
+        # The statement at the checkpoint is run again during the rollback
+        sent_before = len(server.activities)
+        harness.renpy.rolling_back = True
+        harness['discord_set_custom']("Checkpoint")
+        interact()
+        harness.renpy.rolling_back = False
+        expect(server.wait_for(has_state("Checkpoint"), 5.0), "rollback position was not shown")
+        rpc.flush_presence(2.0)
+        sent = [a and a.get('state') for a in server.activities[sent_before:]]
+        expect(sent == ["Checkpoint"], "expected one update after rollback, got {}".format(sent))
+
+        # Loading a save restores the presence stored with it
+        harness.store['discord_rpc_presence_state'] = {'state': "From save", 'details': "Chapter 3"}
+        for callback in harness.config.after_load_callbacks:
+            callback()
+        expect(server.wait_for(has_state("From save"), 5.0), "saved presence was not restored")
+    finally:
+        harness.quit()
+
+
+def scenario_discord_statement(server):
+    """The discord statement lints its payload and reuses it on later runs"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    statement = harness.renpy.statements['discord']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+
+        def parse(text):
+            return statement['parse'](HarnessLexer(text))
+
+        def lint(parsed):
+            try:
+                statement['lint'](parsed)
+            except Exception as e:
+                return str(e)
+            return None
+
+        custom = parse('custom "Exploring" "Chapter 2"')
+        template = parse('template paused_presence state="Taking a break" small_text="AFK"')
+        expect(lint(custom) is None and lint(template) is None, "valid statements failed lint")
+        expect("at least 2" in (lint(parse('custom "A" "Chapter 2"')) or ""), "short state passed lint")
+        expect("cut to 128" in (lint(parse('dialogue "{}"'.format("x" * 130))) or ""), "long text passed lint")
+        expect("unknown presence template" in (lint(parse('template missing_presence')) or ""),
+               "unknown template passed lint")
+        expect("not a presence template" in (lint(parse('template connection')) or ""),
+               "non-presence config section passed lint")
+        expect("cannot override" in (lint(parse('template paused_presence buttons="x"')) or ""),
+               "unknown field passed lint")
+
+        statement['execute'](template)
+        expect(server.wait_for(has_state("Taking a break"), 5.0), "template statement was not sent")
+        expect(server.activities[-1].get('assets', {}).get('small_text') == "AFK", "override was not applied")
+
+        statement['execute'](custom)
+        payload = rpc.get_prepared_presence(custom['key'], lambda: None)
+        expect(payload is not None and payload['state'] == "Exploring", "statement payload was not cached")
+        statement['execute'](custom)
+        expect(rpc.get_prepared_presence(custom['key'], lambda: None) is payload, "payload was rebuilt")
+        expect(server.wait_for(has_state("Exploring"), 5.0), "custom statement was not sent")
+        expect(rpc.last_update is payload, "prepared payload was copied on the way")
+
+        # The cached payload is shared, so it cannot be edited in place
+        edited = payload.copy()
+        edited['state'] = "Edited"
+        expect(type(edited) is dict and payload['state'] == "Exploring", "copy() shares the cached payload")
+        try:
+            payload['state'] = "Edited"
+            expect(False, "prepared payload accepted an edit")
+        except TypeError:
+            pass
+
+        # The priority clause is parsed after the arguments and stays out of the cache key
+        priority = harness['discord_statement_priority']
+        low = parse('custom "Exploring" "Chapter 2" priority low')
+        expect(low['priority'] == "low" and low['key'] == custom['key'], "priority clause was not parsed")
+        overridden = parse('template paused_presence state="Taking a break" priority critical')
+        expect(overridden['priority'] == "critical" and list(overridden['args']['overrides']) == ['state'],
+               "priority clause was read as a template override")
+        batch = statement['parse'](HarnessLexer('batch:', block=['dialogue "Eileen"', 'main_menu']))
+        Priority = harness['DiscordRPCPriority']
+        expect(priority('batch', batch['args'], batch['priority']) == Priority.CRITICAL,
+               "batch did not take its highest line priority")
+        expect(priority('dialogue', {}) == Priority.LOW, "dialogue statement is not low priority")
+        try:
+            parse('custom "Exploring" priority urgent')
+            expect(False, "unknown priority was accepted")
+        except Exception as e:
+            expect("priority" in str(e), "unexpected error for unknown priority: {}".format(e))
+    finally:
+        harness.quit()
+
+
+def scenario_batch(server):
+    """A batch block sends its merged presence once"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    statement = harness.renpy.statements['discord']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+        sent_before = len(server.activities)
+        requested = rpc.get_metrics()['counters']['updates_requested']
+
+        with rpc.batch():
+            harness['discord_set_in_game']("Глава 1", "Эйлин")
+            with rpc.batch():
+                harness['discord_set_custom']("Исследует мир", small_image="compass")
+        expect(rpc.get_metrics()['counters']['updates_requested'] - requested == 1, "batch was not submitted once")
+        expect(server.wait_for(has_state("Исследует мир"), 5.0), "batch was not sent")
+        activity = server.activities[-1]
+        expect(len(server.activities) - sent_before == 1, "batch sent more than one update")
+        expect(activity.get('assets', {}).get('small_image') == "compass", "fields were not merged")
+
+        parsed = statement['parse'](HarnessLexer('batch:', block=[
+            'in_game "Глава 2" "Эйлин"',
+            'template paused_presence small_text="AFK"',
+        ]))
+        statement['lint'](parsed)
+        statement['execute'](parsed)
+        expect(server.wait_for(lambda s: s.activities[-1] and s.activities[-1].get('assets', {}).get('small_text') == "AFK", 5.0),
+               "batch statement was not sent")
+        expect(len(server.activities) - sent_before == 2, "batch statement sent more than one update")
+
+        try:
+            statement['parse'](HarnessLexer('batch:', block=['batch:']))
+            expect(False, "nested batch was accepted")
+        except Exception as e:
+            expect("nested" in str(e), "unexpected error for nested batch: {}".format(e))
+    finally:
+        harness.quit()
+
+
+def scenario_flaky_connection(server):
+    """Repeated drops reuse the scheduler instead of piling up threads"""
+    harness = start(server, connection={'writer_thread_enabled': False})
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        baseline = threading.active_count()
+        peak = baseline
+
+        for drop in range(10):
+            server.drop_connections()
+            deadline = time.monotonic() + 5.0
+            while not (rpc.connected and server.connections >= drop + 2) and time.monotonic() < deadline:
+                peak = max(peak, threading.active_count())
+                time.sleep(0.01)
+            expect(rpc.connected, "no reconnect after drop {}".format(drop + 1))
+
+        metrics = rpc.get_metrics()
+        expect(peak - baseline <= rpc.scheduler.max_workers, "thread count grew from {} to {}".format(baseline, peak))
+        expect(metrics['worker_threads'] <= rpc.scheduler.max_workers, "worker bound exceeded")
+        expect(not rpc.scheduler.is_pending('retry'), "retry still pending while connected")
+    finally:
+        harness.quit()
+
+
+def scenario_shutdown(server):
+    """Shutdown clears the presence and stays within its deadline on a hung Discord"""
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+    elapsed = rpc.shutdown(timeout=1.0)
+    expect(server.wait_for(lambda s: s.activities[-1] is None, 2.0), "presence was not cleared on shutdown")
+    expect(elapsed < 0.5, "shutdown took {:.2f}s with a healthy Discord".format(elapsed))
+    expect(not rpc.scheduler.schedule('late', 0, lambda: None), "scheduler accepted work after shutdown")
+
+    server.reset()
+    harness = start(server)
+    rpc = harness['discord_rpc']
+    expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+    server.latency = 30.0
+    rpc.update_presence(state="Stuck", details="shutdown")  # Writer blocks on the hung Discord
+    time.sleep(0.1)
+    elapsed = rpc.shutdown(timeout=1.0)
+    expect(elapsed < 1.3, "shutdown took {:.2f}s with a hung Discord".format(elapsed))
+
+
+def scenario_token_bucket(server):
+    """Critical bursts stay within Discord's budget and critical updates use the reserve"""
+    server.rate_limit = (5, 2.0)
+    harness = start(server, rate_limiting={'enabled': True, 'burst': 5, 'window': 2.1, 'forced_reserve': 1})
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+        time.sleep(2.2)  # Refill after the initial presence
+        requested = rpc.get_metrics()['counters']['updates_requested']
+
+        # Normal updates stop short of the reserved token
+        for i in range(6):
+            rpc.update_presence(state="Normal {}".format(i))
+            rpc.flush_presence(2.0)
+        expect(server.wait_for(has_state("Normal 3"), 2.0), "normal updates within budget were not sent")
+        expect(not has_state("Normal 4")(server), "normal update used the reserved token")
+
+        rpc.update_presence(state="Critical", priority='critical')
+        rpc.flush_presence(2.0)
+        expect(has_state("Critical")(server), "critical update did not use the reserved token")
+
+        # A critical burst is held and coalesced, not rejected by Discord
+        for i in range(20):
+            rpc.update_presence(state="Burst {}".format(i), priority='critical')
+        expect(server.wait_for(has_state("Burst 19"), 5.0), "final state of the burst was not sent")
+        counters = rpc.get_metrics()['counters']
+        expect(counters['updates_failed'] == 0, "Discord rate limited the module")
+        requested = counters['updates_requested'] - requested
+        expect(requested == 27, "held updates were requested again when sent: {} for 27 calls".format(requested))
+    finally:
+        harness.quit()
+
+
+def scenario_held_update_inline(server):
+    """Without the writer thread, a trailing send in flight does not drop a newer held update"""
+    harness = start(server, connection={'writer_thread_enabled': False},
+                    rate_limiting={'enabled': True, 'burst': 1, 'window': 0.5, 'forced_reserve': 0})
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        server.latency = 0.3
+        time.sleep(0.6)  # Refill after the initial presence
+
+        rpc.update_presence(state="U1")
+        rpc.update_presence(state="U2")
+        expect(server.wait_for(has_command_state("U2"), 3.0), "trailing send did not start")
+        rpc.update_presence(state="U3")  # Held while U2 is in flight
+
+        expect(server.wait_for(has_state("U3"), 5.0), "newest held update was not delivered")
+        expect(server.activities[-1].get('state') == "U3", "an older update was sent after the newest one")
+        expect(rpc.last_update.get('state') == "U3", "last requested presence is not U3")
+    finally:
+        harness.quit()
+
+
+def scenario_burst_during_trailing_send(server):
+    """A burst that arrives while a trailing send is in flight ends on its last update, in both modes"""
+    for writer_thread in (False, True):
+        server.latency = 0.0
+        harness = start(server, connection={'writer_thread_enabled': writer_thread},
+                        rate_limiting={'enabled': True, 'burst': 1, 'window': 0.5, 'forced_reserve': 0})
+        rpc = harness['discord_rpc']
+        mode = "writer thread" if writer_thread else "inline"
+        try:
+            expect(server.wait_for(lambda s: s.activities), "initial presence was not sent ({})".format(mode))
+            rpc.flush_presence(2.0)
+            server.latency = 0.3
+            time.sleep(0.6)
+
+            rpc.update_presence(state="{} first".format(mode))
+            rpc.update_presence(state="{} held".format(mode))
+            expect(server.wait_for(has_command_state("{} held".format(mode)), 3.0),
+                   "trailing send did not start ({})".format(mode))
+            for i in range(10):
+                rpc.update_presence(state="{} burst {}".format(mode, i), priority='critical' if i == 5 else None)
+
+            final = "{} burst 9".format(mode)
+            expect(server.wait_for(has_state(final), 6.0), "last update of the burst was not delivered ({})".format(mode))
+            rpc.flush_presence(2.0)
+            time.sleep(0.6)
+            expect(server.activities[-1].get('state') == final,
+                   "an older update was sent after the burst ({}): {}".format(mode, server.activities[-1]))
+        finally:
+            harness.quit()
+
+
+def scenario_priorities(server):
+    """Low updates are shed first, critical ones preempt held updates"""
+    server.rate_limit = (5, 2.0)
+    harness = start(server, rate_limiting={
+        'enabled': True, 'burst': 5, 'window': 2.1, 'forced_reserve': 1, 'low_priority_reserve': 2,
+    })
+    rpc = harness['discord_rpc']
+    try:
+        expect(server.wait_for(lambda s: s.activities), "initial presence was not sent")
+        rpc.flush_presence(2.0)
+        time.sleep(2.2)  # Refill after the initial presence
+
+        # Low updates leave two tokens alone and are dropped, not held
+        for i in range(4):
+            harness['discord_set_dialogue']("Speaker {}".format(i))
+            rpc.flush_presence(2.0)
+        expect(has_state("Читает диалог")(server), "low updates within budget were not sent")
+        shed = rpc.get_metrics()['counters']['updates_shed']
+        expect(shed == 1, "expected one shed low update, got {}".format(shed))
+
+        rpc.update_presence(state="Normal")
+        rpc.flush_presence(2.0)
+        expect(has_state("Normal")(server), "normal update did not use its token")
+
+        # Only the reserved token is left: normal is held, low cannot replace it
+        rpc.update_presence(state="Held")
+        rpc.flush_presence(2.0)
+        rpc.update_presence(state="Cosmetic", priority='low')
+        rpc.flush_presence(2.0)
+        expect(rpc._throttled_update is not None and rpc._throttled_update[0]['state'] == "Held",
+               "low update replaced the held normal one")
+
+        # Critical takes the reserved token at once and makes the held update obsolete
+        harness['discord_set_main_menu']()
+        rpc.flush_presence(2.0)
+        expect(server.wait_for(lambda s: s.activities[-1] and s.activities[-1].get('state') == "В главном меню", 2.0),
+               "critical update was not sent ahead of the held one")
+        time.sleep(2.3)
+        expect(not has_state("Held")(server) and not has_state("Cosmetic")(server),
+               "superseded updates reached Discord")
+        expect(rpc.get_metrics()['counters']['updates_failed'] == 0, "Discord rate limited the module")
+
+        # While reconnecting low updates are not queued
+        rpc.disconnect()
+        server.handshake_latency = 0.5
+        rpc.connect(sync_startup=False)
+        expect(not rpc.update_presence(state="Offline", priority='low'), "low update was queued while connecting")
+        expect(rpc.update_presence(state="Queued"), "normal update was not queued while connecting")
+        expect(server.wait_for(has_state("Queued"), 5.0), "queued update was not delivered")
+        expect(not has_state("Offline")(server), "shed low update reached Discord")
+    finally:
+        harness.quit()
+
+
+SCENARIOS = [
+    scenario_connect_and_update,
+    scenario_slow_discord,
+    scenario_queued_while_connecting,
+    scenario_queued_as_connection_opens,
+    scenario_reconnect_after_drop,
+    scenario_reconnect_sends_final_state,
+    scenario_invalid_client_id,
+    scenario_payload_rejected,
+    scenario_invalid_command,
+    scenario_broken_pipe,
+    scenario_rate_limited_by_discord,
+    scenario_transport_lost_off_game_thread,
+    scenario_heartbeat,
+    scenario_auto_tracking,
+    scenario_manual_over_tracking,
+    scenario_config_caches,
+    scenario_skipping,
+    scenario_rollback_and_load,
+    scenario_discord_statement,
+    scenario_batch,
+    scenario_flaky_connection,
+    scenario_shutdown,
+    scenario_token_bucket,
+    scenario_held_update_inline,
+    scenario_burst_during_trailing_send,
+    scenario_priorities,
+]
+
+
+def run(names=None):
+    """
+    Run scenarios, each against a fresh fake server
+
+    Args:
+        names (list): Scenario names without the "scenario_" prefix (default: all)
+
+    Returns:
+        bool: True if every scenario passed
+    """
+    os.environ['XDG_RUNTIME_DIR'] = tempfile.mkdtemp(prefix='discord-rpc-')
+    selected = [s for s in SCENARIOS if not names or s.__name__[len('scenario_'):] in names]
+    failed = 0
+
+    print("=== Discord RPC IPC Scenarios ===")
+    for scenario in selected:
+        name = scenario.__name__[len('scenario_'):]
+        started = time.perf_counter()
+        try:
+            with FakeDiscordIPCServer() as server:
+                scenario(server)
+            print("✓ {} ({:.2f}s)".format(name, time.perf_counter() - started))
+        except Exception as e:
+            failed += 1
+            print("✗ {}: {}".format(name, e))
+
+    print("=== {} passed, {} failed ===".format(len(selected) - failed, failed))
+    return failed == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(sys.argv[1:]) else 1)
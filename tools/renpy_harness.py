@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Headless Ren'Py Harness
+# Loads the Discord RPC module files into a plain Python namespace with a
+# minimal Ren'Py store, so they can run outside the engine (tests, benchmarks)
+
+import os
+import re
+import textwrap
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_CLIENT_ID = "123456789012345678"
+
+# Files loaded by default, in the order Ren'Py sorts them
+MODULE_FILES = [
+    'discord_rpc_api_ren.py',
+    'discord_rpc_config.rpy',
+    'discord_rpc_ipc_ren.py',
+    'discord_rpc_reliability_ren.py',
+    'discord_rpc_ren.py',
+    'discord_rpc_settings.rpy',
+    'libs/01-discord-rpc_ren.py',
+]
+
+REN_PY_BLOCK = re.compile(r'"""renpy\n(.*?)\n"""\n', re.S)
+INIT_HEADER = re.compile(r'init(?:\s+(-?\d+))?\s+python\b.*:$')
+DEFINE_LINE = re.compile(r'(define|default)\s+([\w.]+)\s*=\s*(.*)$')
+
+
+class HarnessNamespace(types.SimpleNamespace):
+    """Attribute bag used for config and discord_config"""
+
+
+class HarnessPersistent(types.SimpleNamespace):
+    """Like Ren'Py's persistent object, unknown fields read as None"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+
+class HarnessRenpy(types.SimpleNamespace):
+    """The subset of the renpy module the Discord RPC files use"""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = HarnessNamespace()
+        self.statements = {}
+        self.notifications = []
+        self.skipping = False
+        self.rolling_back = False
+        self.screens = set()
+
+    def error(self, message):
+        raise Exception(message)
+
+    def notify(self, message):
+        self.notifications.append(message)
+
+    def register_statement(self, name, **kwargs):
+        self.statements[name] = kwargs
+
+    def is_skipping(self):
+        return self.skipping
+
+    def in_rollback(self):
+        return self.rolling_back
+
+    def get_screen(self, name, layer=None):
+        return name if name in self.screens else None
+
+    def version(self):
+        return "harness"
+
+
+class HarnessLexer:
+    """
+    The subset of Ren'Py's Lexer that creator-defined statement parsers use,
+    over the text after the statement name
+
+    Example:
+        parse = harness.renpy.statements['discord']['parse']
+        parsed = parse(HarnessLexer('custom "State" "Details"'))
+        parsed = parse(HarnessLexer('batch:', block=['loading', 'paused']))
+    """
+
+    WORD = re.compile(r'[a-zA-Z_]\w*')
+    STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, text, block=None):
+        """
+        Args:
+            text (str): Statement line after the statement name
+            block (list): Lines of the indented block under it, if any
+        """
+        self.lines = [text]
+        self.index = 0
+        self.text = text
+        self.pos = 0
+        self.block = list(block) if block else None
+
+    def advance(self):
+        """Move to the next line of a sub-block lexer"""
+        self.index += 1
+        if self.index >= len(self.lines):
+            return False
+        self.text = self.lines[self.index]
+        self.pos = 0
+        return True
+
+    def subblock_lexer(self):
+        lexer = HarnessLexer('')
+        lexer.lines = self.block or []
+        lexer.index = -1
+        return lexer
+
+    def expect_block(self, stmt):
+        if not self.block:
+            self.error("{} expects a non-empty block.".format(stmt))
+
+    def expect_noblock(self, stmt):
+        if self.block:
+            self.error("{} does not expect a block.".format(stmt))
+
+    def expect_eol(self):
+        if not self.eol():
+            self.error("end of line expected.")
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def _token(self, pattern):
+        self._skip_whitespace()
+        match = pattern.match(self.text, self.pos)
+        if not match:
+            return None
+        self.pos = match.end()
+        return match
+
+    def eol(self):
+        self._skip_whitespace()
+        return self.pos >= len(self.text)
+
+    def match(self, regexp):
+        match = self._token(re.compile(regexp))
+        return match.group(0) if match else None
+
+    def word(self):
+        match = self._token(self.WORD)
+        return match.group(0) if match else None
+
+    name = word
+
+    def string(self):
+        match = self._token(self.STRING)
+        return match.group(1).replace('\\"', '"') if match else None
+
+    def require(self, thing, name=None):
+        rv = self.match(thing) if isinstance(thing, str) else thing()
+        if rv is None:
+            self.error("expected '{}' not found.".format(name or thing))
+        return rv
+
+    def error(self, message):
+        raise SyntaxError(message)
+
+
+def _balanced(expr):
+    opening = sum(expr.count(c) for c in '{[(')
+    closing = sum(expr.count(c) for c in '}])')
+    return opening <= closing
+
+
+def _parse_rpy(path):
+    """
+    Extract define/default statements and init python blocks from an .rpy file
+
+    Returns:
+        list: (priority, kind, payload) tuples in file order
+    """
+    lines = open(path, encoding='utf-8').read().split('\n')
+    offset = 0
+    items = []
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        match = re.match(r'init\s+offset\s*=\s*(-?\d+)', stripped)
+        if match and not line.startswith(' '):
+            offset = int(match.group(1))
+            i += 1
+            continue
+
+        match = DEFINE_LINE.match(line)
+        if match:
+            expr = match.group(3)
+            while not _balanced(expr):
+                i += 1
+                expr += '\n' + lines[i]
+            items.append((offset, match.group(1), (match.group(2), expr)))
+            i += 1
+            continue
+
+        match = INIT_HEADER.match(line)
+        if match:
+            priority = int(match.group(1) or 0) + offset
+            body = []
+            i += 1
+            while i < len(lines) and (lines[i].startswith(' ') or not lines[i].strip()):
+                body.append(lines[i])
+                i += 1
+            items.append((priority, 'python', textwrap.dedent('\n'.join(body))))
+            continue
+
+        i += 1
+
+    return items
+
+
+def _parse_ren_py(path):
+    """Extract the blocks Ren'Py runs from a _ren.py file (IDE hints are skipped)"""
+    source = open(path, encoding='utf-8').read()
+    parts = REN_PY_BLOCK.split(source)
+    items = []
+
+    for i in range(1, len(parts), 2):
+        header_lines = parts[i].strip().split('\n')
+        body = parts[i + 1]
+
+        # define/default statements placed in the block before its python header
+        for line in header_lines[:-1]:
+            match = DEFINE_LINE.match(line)
+            if match:
+                items.append((0, match.group(1), (match.group(2), match.group(3))))
+
+        header = header_lines[-1].strip()
+        if header.startswith('python early'):
+            priority = -10000
+        else:
+            match = INIT_HEADER.match(header)
+            priority = int(match.group(1) or 0) if match else 0
+        items.append((priority, 'python', body))
+
+    return items
+
+
+class RenPyHarness:
+    """
+    Loads the module files into one store namespace
+
+    Example:
+        harness = RenPyHarness().load()
+        harness.store['discord_rpc'].update_presence(state="Test")
+        harness.quit()
+    """
+
+    def __init__(self, root=REPO_ROOT, files=None, client_id=TEST_CLIENT_ID,
+                 game_name="Harness Game", overrides=None, quiet=True):
+        """
+        Args:
+            root (str): Repository root holding the module files
+            files (list): Module files to load (default: MODULE_FILES)
+            client_id (str): Value for persistent.discord_rpc_client_id
+            game_name (str): Value for config.name
+            overrides (dict): discord_config sections to update before init,
+                e.g. {'connection': {'writer_thread_enabled': False}}
+            quiet (bool): Suppress print() from the modules
+        """
+        self.root = root
+        self.files = list(files or MODULE_FILES)
+        self.client_id = client_id
+        self.overrides = overrides or {}
+        self.quiet = quiet
+        self.store = {'__name__': 'store'}
+
+        self.config = HarnessNamespace(
+            name=game_name,
+            quit_callbacks=[],
+            label_callbacks=[],
+            interact_callbacks=[],
+            all_character_callbacks=[],
+            periodic_callbacks=[],
+            after_load_callbacks=[],
+            start_callbacks=[],
+            skipping=None,
+        )
+        self.persistent = HarnessPersistent()
+        self.renpy = HarnessRenpy(self.store)
+
+    def _exec(self, source, filename):
+        exec(compile(source, filename, 'exec'), self.store)
+
+    def load(self):
+        """Run every init block in Ren'Py order. Returns self."""
+        self.store.update({
+            'config': self.config,
+            'persistent': self.persistent,
+            'renpy': self.renpy,
+            'discord_config': HarnessNamespace(),
+        })
+        if self.quiet:
+            self.store['print'] = lambda *args, **kwargs: None
+
+        items = []
+        for index, name in enumerate(self.files):
+            path = os.path.join(self.root, name)
+            parsed = _parse_rpy(path) if name.endswith('.rpy') else _parse_ren_py(path)
+            for position, (priority, kind, payload) in enumerate(parsed):
+                items.append((priority, index, position, name, kind, payload))
+        # Persistent defaults behave as if an earlier session had saved them
+        items = [((-100000,) + item[1:]) if item[4] == 'default' and item[5][0].startswith('persistent.')
+                 else item for item in items]
+        items.sort(key=lambda item: item[:3])
+
+        for priority, index, position, name, kind, payload in items:
+            if kind == 'python':
+                self._before_block(priority)
+                self._exec(payload, name)
+            else:
+                target, expr = payload
+                if '.' not in target:
+                    # Plain store variable
+                    if not (kind == 'default' and self.store.get(target) is not None):
+                        self.store[target] = eval(expr, self.store)
+                    continue
+                obj_name, attr = target.split('.', 1)
+                obj = self.store[obj_name]
+                if kind == 'default' and getattr(obj, attr, None) is not None:
+                    continue
+                setattr(obj, attr, eval(expr, self.store))
+
+        return self
+
+    def _before_block(self, priority):
+        """Apply test settings once discord_config is defined, before the modules read it"""
+        discord_config = self.store['discord_config']
+        if getattr(self, '_configured', False) or not hasattr(discord_config, 'connection'):
+            return
+        self._configured = True
+
+        self.persistent.discord_rpc_client_id = self.client_id
+        self.persistent.discord_rpc_sync_startup = False
+        discord_config.application_id = self.client_id
+        for section, values in self.overrides.items():
+            current = getattr(discord_config, section, None)
+            if isinstance(current, dict) and isinstance(values, dict):
+                current.update(values)
+            else:
+                setattr(discord_config, section, values)
+
+    def __getitem__(self, name):
+        return self.store[name]
+
+    def quit(self):
+        """Run config.quit_callbacks like Ren'Py does on exit"""
+        for callback in list(self.config.quit_callbacks):
+            try:
+                callback()
+            except Exception as e:
+                print("quit callback failed: {}".format(e))